@@ -1,7 +1,13 @@
+from .events import ServiceEvent
+from .factory import (SCOPE_BUNDLE, SCOPE_PROTOTYPE, SCOPE_SINGLETON,
+                      ServiceFactory)
 from .framework import Framework
+from .metrics import RegistryMetrics
+from .timeline import Timeline, span
+from .tracker import ServiceTracker
 
-def create_framework(bundles, settings):
-    cdi = Framework(settings)
+def create_framework(bundles, settings, timeline=None):
+    cdi = Framework(settings, timeline)
     for bundle_name in bundles:
         cdi.install_bundle(bundle_name)
     return cdi
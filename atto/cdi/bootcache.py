@@ -0,0 +1,166 @@
+import hashlib
+import importlib.machinery
+import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+
+class BootCache:
+    VERSION = 1
+
+    def __init__(self, path, settings):
+        self.__path = path
+        self.__settings_hash = settings_hash(settings)
+        self.__bundles = {}
+        # file keys are computed once, packages are walked for every module
+        self.__keys = {}
+        self.__changed = False
+        self.__load()
+
+    def __load(self):
+        try:
+            with open(self.__path) as cache:
+                data = json.load(cache)
+        except (IOError, ValueError):
+            return
+        if not isinstance(data, dict) or \
+                data.get('version') != self.VERSION or \
+                data.get('settings') != self.__settings_hash:
+            logger.debug('Outdated boot cache: "%s"', self.__path)
+            return
+        bundles = data.get('bundles')
+        if not isinstance(bundles, dict):
+            return
+        # partly written or edited entries are resolved again
+        self.__bundles = {name: entry for name, entry in bundles.items()
+                          if _valid_entry(entry)}
+
+    def spec(self, name):
+        entry = self.__entry(name)
+        if entry is None:
+            return None
+        spec = importlib.machinery.ModuleSpec(
+            name, None, origin=entry['origin'],
+            is_package=entry['package'])
+        spec.has_location = True
+        return spec
+
+    def set_spec(self, name, spec):
+        origin = getattr(spec, 'origin', None)
+        package = spec.submodule_search_locations is not None
+        key = self.__file_key(origin, package)
+        if key is None:
+            return
+        self.__bundles[name] = {
+            'origin': origin,
+            'key': key,
+            'package': package,
+        }
+        self.__changed = True
+
+    def metadata(self, bundle):
+        # cached (requires, provides) or None
+        entry = self.__entry(bundle.name)
+        if entry is None or 'requires' not in entry:
+            return None
+        requires, provides = entry['requires'], entry['provides']
+        if requires is None:
+            return None, None
+        return tuple(requires), tuple(provides)
+
+    def set_metadata(self, bundle, metadata):
+        entry = self.__entry(bundle.name)
+        if entry is None:
+            return
+        entry['requires'], entry['provides'] = metadata
+        self.__changed = True
+
+    def __entry(self, name):
+        entry = self.__bundles.get(name)
+        if entry is None:
+            return None
+        if self.__file_key(entry['origin'], entry['package']) != entry['key']:
+            # module changed, its spec and metadata are resolved again
+            del self.__bundles[name]
+            self.__changed = True
+            return None
+        return entry
+
+    def __file_key(self, path, package):
+        try:
+            return self.__keys[path, package]
+        except KeyError:
+            key = self.__keys[path, package] = _file_key(path, package)
+            return key
+
+    def save(self):
+        if not self.__changed:
+            return
+        data = {
+            'version': self.VERSION,
+            'settings': self.__settings_hash,
+            'bundles': self.__bundles,
+        }
+        temp_path = '{}.{}.tmp'.format(self.__path, os.getpid())
+        try:
+            with open(temp_path, 'w') as cache:
+                json.dump(data, cache)
+            os.replace(temp_path, self.__path)
+        except (IOError, TypeError, ValueError):
+            logger.warning('Can not write boot cache: "%s"', self.__path)
+            return
+        self.__changed = False
+
+
+def settings_hash(settings):
+    items = settings.items() if isinstance(settings, dict) else \
+        vars(settings).items()
+    data = repr(sorted((name, repr(value)) for name, value in items))
+    return hashlib.sha1(data.encode('utf-8')).hexdigest()
+
+
+def _file_key(path, package=False):
+    # package is changed with any of its modules, e.g. activator module
+    if not path:
+        return None
+    if not package:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return [stat.st_mtime_ns, stat.st_size]
+    if not os.path.isfile(path):
+        return None
+    directory = os.path.dirname(path)
+    files = []
+    for root, dirs, names in os.walk(directory):
+        dirs.sort()
+        for name in sorted(names):
+            if not name.endswith('.py'):
+                continue
+            file_path = os.path.join(root, name)
+            try:
+                stat = os.stat(file_path)
+            except OSError:
+                continue
+            files.append((os.path.relpath(file_path, directory),
+                          stat.st_mtime_ns, stat.st_size))
+    return hashlib.sha1(repr(files).encode('utf-8')).hexdigest()
+
+
+def _valid_entry(entry):
+    if not isinstance(entry, dict) or \
+            not isinstance(entry.get('origin'), str) or \
+            not isinstance(entry.get('key'), (list, str)) or \
+            not isinstance(entry.get('package'), bool):
+        return False
+    if 'requires' not in entry and 'provides' not in entry:
+        return True
+    requires, provides = entry.get('requires'), entry.get('provides')
+    if requires is None and provides is None:
+        return True
+    return all(isinstance(specs, list) and
+               all(isinstance(spec, str) for spec in specs)
+               for specs in (requires, provides))
@@ -1,4 +1,17 @@
+import importlib
+import importlib.util
+import sys
+import time
+
+from .errors import BundleException
+from .factory import (SCOPE_BUNDLE, SERVICE_SCOPE, CallableFactory,
+                      ServiceFactory)
+from .tracker import ServiceTracker
+
+
 class Bundle:
+    __slots__ = ('__framework', '__id', '__name', '__module', '__spec',
+                 '__import_time', '_state')
 
     UNINSTALLED = 1
     INSTALLED = 2
@@ -7,11 +20,15 @@ class Bundle:
     STOPPING = 16
     ACTIVE = 32
 
-    def __init__(self, framework, bundle_id, bundle_name, py_module):
+    def __init__(self, framework, bundle_id, bundle_name, py_module,
+                 spec=None):
         self.__framework = framework
         self.__id = bundle_id
         self.__name = bundle_name
         self.__module = py_module
+        # module found by spec is imported on first use
+        self.__spec = spec
+        self.__import_time = None
         self._state = Bundle.RESOLVED
 
     @property
@@ -32,8 +49,67 @@ class Bundle:
 
     @property
     def module(self):
+        if self.__module is None and self.__spec is not None:
+            return self.load()
         return self.__module
 
+    @property
+    def loaded(self):
+        return self.__module is not None
+
+    @property
+    def origin(self):
+        # module source file, known without import
+        return getattr(self.__spec, 'origin', None)
+
+    @property
+    def is_package(self):
+        return getattr(self.__spec, 'submodule_search_locations',
+                       None) is not None
+
+    @property
+    def import_time(self):
+        return self.__import_time
+
+    def load(self):
+        if self.__module is None and self.__spec is not None:
+            start = time.perf_counter()
+            try:
+                module = importlib.import_module(self.__name)
+            except Exception as ex:
+                raise BundleException(
+                    'Error importing bundle "{0}": {1}'.format(
+                        self.__name, ex))
+            self.__import_time = time.perf_counter() - start
+            self.__module = module
+        return self.__module
+
+    def reload(self):
+        # drop module with its submodules, so they are imported again
+        prefix = self.__name + '.'
+        modules = {name: module for name, module in sys.modules.items()
+                   if name == self.__name or name.startswith(prefix)}
+        for name in modules:
+            del sys.modules[name]
+        importlib.invalidate_caches()
+        previous = self.__module, self.__spec, self.__import_time
+        try:
+            self.__spec = importlib.util.find_spec(self.__name)
+            if self.__spec is None:
+                raise BundleException(
+                    'Error importing bundle "{0}": module not found'.format(
+                        self.__name))
+            self.__module = None
+            return self.load()
+        except Exception as ex:
+            # keep running previous version
+            sys.modules.update(modules)
+            self.__module, self.__spec, self.__import_time = previous
+            if isinstance(ex, BundleException):
+                raise
+            raise BundleException(
+                'Error importing bundle "{0}": {1}'.format(self.__name, ex))
+
 
 class BundleContext:
 
@@ -45,7 +121,9 @@ class BundleContext:
         return "BundleContext({0})".format(self.__bundle)
 
     def get_bundle(self, bundle_id=None) -> Bundle:
-        pass
+        if bundle_id is None:
+            return self.__bundle
+        return self.__framework.get_bundle(bundle_id)
 
     @property
     def bundles(self):
@@ -55,7 +133,11 @@ class BundleContext:
         return self.__framework.get_property(name)
 
     def get_service(self, reference):
-        pass
+        return self.__framework.get_service(self.__bundle, reference)
+
+    def unget_service(self, reference, service=None):
+        return self.__framework.unget_service(
+            self.__bundle, reference, service)
 
     def get_service_reference(self, clazz, filter=None):
         return self.__framework.get_service_reference(clazz, filter)
@@ -64,11 +146,33 @@ class BundleContext:
         return self.__framework.get_service_references(clazz, filter)
 
     def install_bundle(self, name, path=None):
-        pass
+        return self.__framework.install_bundle(name, path)
 
     def install_package(self, path, recursive=False):
-        pass
+        return self.__framework.install_package(path, recursive)
 
     def register_service(self, clazz, service, properties=None):
         return self.__framework.register_service(
             self.__bundle, clazz, service, properties)
+
+    def register_factory(self, clazz, factory, properties=None,
+                         scope=SCOPE_BUNDLE):
+        if not isinstance(factory, ServiceFactory):
+            factory = CallableFactory(factory)
+        properties = dict(properties or {})
+        properties[SERVICE_SCOPE] = scope
+        return self.register_service(clazz, factory, properties)
+
+    def register_many(self, services):
+        return self.__framework.register_many(self.__bundle, services)
+
+    def add_service_listener(self, listener, clazz=None, filter=None,
+                             replay=False):
+        self.__framework.add_service_listener(
+            self.__bundle, listener, clazz, filter, replay)
+
+    def remove_service_listener(self, listener):
+        return self.__framework.remove_service_listener(listener)
+
+    def track_services(self, clazz, filter=None):
+        return ServiceTracker(self, clazz, filter).open()
@@ -0,0 +1,109 @@
+from collections import deque
+
+from atto_api.cdi.consts import ACTIVATOR
+
+from .errors import FrameworkException
+from .utils import classes_name
+
+REQUIRES = 'requires'
+PROVIDES = 'provides'
+
+_MODULE_REQUIRES = '__requires__'
+_MODULE_PROVIDES = '__provides__'
+
+
+def bundle_metadata(bundle):
+    # (requires, provides) class names, both None when not declared
+    activator = getattr(bundle.module, ACTIVATOR, None)
+    requires = getattr(activator, REQUIRES, None)
+    provides = getattr(activator, PROVIDES, None)
+    if requires is None:
+        requires = getattr(bundle.module, _MODULE_REQUIRES, None)
+    if provides is None:
+        provides = getattr(bundle.module, _MODULE_PROVIDES, None)
+    if requires is None and provides is None:
+        return None, None
+    return (classes_name(requires) if requires else (),
+            classes_name(provides) if provides else ())
+
+
+class BundleGraph:
+    def __init__(self, bundles, metadata=bundle_metadata):
+        self.__bundles = list(bundles)
+        self.__dependencies = {bundle: {} for bundle in self.__bundles}
+        self.__dependents = {bundle: [] for bundle in self.__bundles}
+        self.__build(metadata)
+
+    def __build(self, metadata):
+        declared = {bundle: metadata(bundle) for bundle in self.__bundles}
+        providers = {}
+        for bundle, (requires, provides) in declared.items():
+            for spec in provides or ():
+                providers.setdefault(spec, []).append(bundle)
+
+        # bundles without metadata may provide anything, so they keep
+        # install order against all bundles installed before, it is enough
+        # to wait for previous such bundle and declared bundles after it
+        undeclared = None
+        since = []
+        for bundle in self.__bundles:
+            requires, provides = declared[bundle]
+            if requires is None:
+                for previous in since:
+                    self.__add(bundle, previous, False)
+                undeclared = bundle
+                since = [bundle]
+                continue
+            since.append(bundle)
+            for spec in requires:
+                found = [item for item in providers.get(spec, ())
+                         if item is not bundle]
+                for provider in found:
+                    self.__add(bundle, provider, True)
+                if not found and undeclared is not None:
+                    self.__add(bundle, undeclared, False)
+
+    def __add(self, bundle, dependency, required):
+        dependencies = self.__dependencies[bundle]
+        if dependency not in dependencies:
+            self.__dependents[dependency].append(bundle)
+        dependencies[dependency] = dependencies.get(dependency) or required
+
+    def dependencies(self, bundle):
+        # {dependency: required}, bundle can not work without required
+        # dependency, others only keep start order
+        return self.__dependencies[bundle]
+
+    def dependents(self, bundle):
+        return self.__dependents[bundle]
+
+    def order(self):
+        pending = {bundle: len(self.__dependencies[bundle])
+                   for bundle in self.__bundles}
+        ready = deque(
+            bundle for bundle in self.__bundles if not pending[bundle])
+        order = []
+        while ready:
+            bundle = ready.popleft()
+            order.append(bundle)
+            for dependent in self.__dependents[bundle]:
+                pending[dependent] -= 1
+                if not pending[dependent]:
+                    ready.append(dependent)
+        if len(order) != len(self.__bundles):
+            cycle = self.__find_cycle(
+                [bundle for bundle in self.__bundles if pending[bundle]])
+            raise FrameworkException('Bundle dependency cycle: {}'.format(
+                ' -> '.join(bundle.name for bundle in cycle)))
+        return order
+
+    def __find_cycle(self, bundles):
+        # every left bundle has unresolved dependency, walk them until repeat
+        left = set(bundles)
+        path = [bundles[0]]
+        while True:
+            bundle = next(item for item in self.__dependencies[path[-1]]
+                          if item in left)
+            if bundle in path:
+                return path[path.index(bundle):] + [bundle]
+            path.append(bundle)
@@ -0,0 +1,318 @@
+import ast
+import importlib.util
+import json
+import logging
+import os
+
+from atto_api.cdi.consts import ACTIVATOR
+
+from .dependencies import PROVIDES, REQUIRES
+from .errors import BundleException
+from .utils import class_name
+
+logger = logging.getLogger(__name__)
+
+_INIT = '__init__.py'
+_SUFFIX = '.py'
+
+
+def find_bundles(path, recursive=False, manifest=None):
+    directory, package = package_location(path)
+    if manifest is None:
+        manifest = Manifest()
+    names = []
+    for file_path, name in _modules(directory, package, recursive):
+        if manifest.has_activator(file_path):
+            names.append(name)
+    manifest.save()
+    return names
+
+
+def package_location(path):
+    # (directory, dotted package name) for package name or directory
+    if os.path.isdir(path):
+        directory = os.path.abspath(path)
+        parts = []
+        parent = directory
+        while os.path.isfile(os.path.join(parent, _INIT)):
+            parent, name = os.path.split(parent)
+            parts.append(name)
+        if not parts:
+            raise BundleException('Not a package: "{}"'.format(path))
+        return directory, '.'.join(reversed(parts))
+    try:
+        spec = importlib.util.find_spec(path)
+    except (ImportError, ValueError) as ex:
+        raise BundleException('Not found package "{}": {}'.format(path, ex))
+    if spec is None or not spec.submodule_search_locations:
+        raise BundleException('Not found package: "{}"'.format(path))
+    return list(spec.submodule_search_locations)[0], path
+
+
+def _modules(directory, package, recursive):
+    yield os.path.join(directory, _INIT), package
+    for entry in sorted(os.scandir(directory), key=lambda item: item.name):
+        if entry.name.startswith(('.', '_')):
+            continue
+        if entry.is_file() and entry.name.endswith(_SUFFIX):
+            name = entry.name[:-len(_SUFFIX)]
+            yield entry.path, '{}.{}'.format(package, name)
+        elif recursive and entry.is_dir() and \
+                os.path.isfile(os.path.join(entry.path, _INIT)):
+            yield from _modules(
+                entry.path, '{}.{}'.format(package, entry.name), recursive)
+
+
+def has_activator(source):
+    # static check, module is not imported
+    if 'activator' not in source and 'ACTIVATOR' not in source:
+        return False
+    try:
+        tree = ast.parse(source)
+    except SyntaxError:
+        return False
+    for node in tree.body:
+        if isinstance(node, ast.ClassDef):
+            if any(_is_activator_decorator(item)
+                   for item in node.decorator_list):
+                return True
+        elif isinstance(node, ast.Assign):
+            if any(_is_activator_target(item) for item in node.targets):
+                return True
+        elif isinstance(node, ast.Expr) and isinstance(node.value, ast.Call):
+            call = node.value
+            if _name(call.func) == 'setattr' and len(call.args) > 1 and \
+                    _is_activator_key(call.args[1]):
+                return True
+    return False
+
+
+def _name(node):
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        return node.attr
+    return None
+
+
+def _is_activator_decorator(node):
+    if isinstance(node, ast.Call):
+        node = node.func
+    return _name(node) == 'activator'
+
+
+def _is_activator_target(node):
+    if isinstance(node, ast.Name):
+        return node.id == ACTIVATOR
+    if isinstance(node, ast.Subscript):
+        return _is_activator_key(node.slice)
+    return False
+
+
+def _is_activator_key(node):
+    if type(node).__name__ == 'Index':  # python < 3.9
+        node = node.value
+    if isinstance(node, ast.Constant):
+        return node.value == ACTIVATOR
+    return _name(node) == 'ACTIVATOR'
+
+
+class Manifest:
+    VERSION = 1
+
+    def __init__(self, path=None):
+        self.__path = path
+        self.__entries = {}
+        self.__changed = False
+        if path is not None:
+            self.__load()
+
+    def __load(self):
+        try:
+            with open(self.__path) as manifest:
+                data = json.load(manifest)
+        except (IOError, ValueError):
+            return
+        if isinstance(data, dict) and data.get('version') == self.VERSION:
+            self.__entries = data.get('modules', {})
+
+    def has_activator(self, file_path):
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return False
+        key = [stat.st_mtime_ns, stat.st_size]
+        entry = self.__entries.get(file_path)
+        if entry is not None and entry[:2] == key:
+            return entry[2]
+        try:
+            with open(file_path, 'rb') as module:
+                source = module.read().decode('utf-8')
+        except (IOError, UnicodeDecodeError):
+            logger.warning('Can not read module: "%s"', file_path)
+            return False
+        found = has_activator(source)
+        self.__entries[file_path] = key + [found]
+        self.__changed = True
+        return found
+
+    def save(self):
+        if self.__path is None or not self.__changed:
+            return
+        data = {'version': self.VERSION, 'modules': self.__entries}
+        temp_path = '{}.{}.tmp'.format(self.__path, os.getpid())
+        try:
+            with open(temp_path, 'w') as manifest:
+                json.dump(data, manifest)
+            os.replace(temp_path, self.__path)
+        except IOError:
+            logger.warning('Can not write bundle manifest: "%s"', self.__path)
+            return
+        self.__changed = False
+
+
+def source_metadata(path, module_name, is_package=False):
+    # (requires, provides) declared by module source, as bundle_metadata
+    # returns them, or None when they can not be found without importing
+    # the module, imported classes are taken from their own modules
+    try:
+        with open(path, 'rb') as module:
+            tree = ast.parse(module.read().decode('utf-8'))
+    except (IOError, UnicodeDecodeError, SyntaxError, ValueError):
+        return None
+    package = module_name if is_package else module_name.rpartition('.')[0]
+    names = _SourceNames(module_name, package)
+    activator = None
+    found = {}
+    for node in tree.body:
+        names.visit(node)
+        if isinstance(node, ast.ClassDef) and any(
+                _is_activator_decorator(item)
+                for item in node.decorator_list):
+            activator = node
+        elif isinstance(node, ast.Assign):
+            for target in node.targets:
+                if _is_activator_target(target):
+                    activator = names.classes.get(_called_name(node.value))
+                elif isinstance(target, ast.Name) and \
+                        target.id in _MODULE_METADATA:
+                    found.setdefault(_MODULE_METADATA[target.id], node.value)
+        elif isinstance(node, ast.Expr) and isinstance(node.value, ast.Call):
+            call = node.value
+            if _name(call.func) == 'setattr' and len(call.args) > 2 and \
+                    _is_activator_key(call.args[1]):
+                activator = names.classes.get(_called_name(call.args[2]))
+    if activator is None:
+        return None
+    declared = {}
+    for node in activator.body:
+        if isinstance(node, ast.Assign):
+            for target in node.targets:
+                if isinstance(target, ast.Name) and \
+                        target.id in (REQUIRES, PROVIDES):
+                    declared[target.id] = node.value
+    for key, value in found.items():
+        declared.setdefault(key, value)
+    if not declared:
+        return None, None
+    metadata = []
+    for key in (REQUIRES, PROVIDES):
+        if key not in declared:
+            metadata.append(())
+            continue
+        specs = names.resolve_all(declared[key])
+        if specs is None:
+            return None
+        metadata.append(specs)
+    return tuple(metadata)
+
+
+_MODULE_METADATA = {'__requires__': REQUIRES, '__provides__': PROVIDES}
+
+
+def _called_name(node):
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name):
+        return node.func.id
+    return None
+
+
+class _SourceNames:
+    def __init__(self, module_name, package):
+        self.module_name = module_name
+        self.package = package
+        self.imported = {}
+        self.classes = {}
+
+    def visit(self, node):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                if alias.asname:
+                    self.imported[alias.asname] = alias.name
+                else:
+                    name = alias.name.partition('.')[0]
+                    self.imported[name] = name
+        elif isinstance(node, ast.ImportFrom):
+            module = self.__absolute(node.module, node.level)
+            for alias in node.names:
+                self.imported[alias.asname or alias.name] = \
+                    '{}.{}'.format(module, alias.name)
+        elif isinstance(node, ast.ClassDef):
+            self.classes[node.name] = node
+            self.imported.pop(node.name, None)
+
+    def __absolute(self, module, level):
+        if not level:
+            return module
+        parts = self.package.split('.')
+        base = '.'.join(parts[:len(parts) - level + 1])
+        return '{}.{}'.format(base, module) if module else base
+
+    def resolve_all(self, node):
+        if isinstance(node, (ast.Tuple, ast.List)):
+            items = node.elts
+        else:
+            items = [node]
+        specs = []
+        for item in items:
+            spec = self.resolve(item)
+            if spec is None:
+                return None
+            specs.append(spec)
+        return tuple(specs)
+
+    def resolve(self, node):
+        if isinstance(node, ast.Constant) and isinstance(node.value, str):
+            return node.value
+        if isinstance(node, ast.Name) and node.id in self.classes:
+            return '{}.{}'.format(self.module_name, node.id)
+        path = self.__path(node)
+        if path is None or path.startswith(self.module_name + '.'):
+            # names from bundle own package are known after its import
+            return None
+        return _imported_name(path)
+
+    def __path(self, node):
+        if isinstance(node, ast.Name):
+            return self.imported.get(node.id)
+        if isinstance(node, ast.Attribute):
+            owner = self.__path(node.value)
+            return None if owner is None else '{}.{}'.format(
+                owner, node.attr)
+        return None
+
+
+def _imported_name(path):
+    # class may be reexported, its name is known only from class itself
+    parts = path.split('.')
+    for index in range(len(parts) - 1, 0, -1):
+        try:
+            value = importlib.import_module('.'.join(parts[:index]))
+        except ImportError:
+            continue
+        try:
+            for name in parts[index:]:
+                value = getattr(value, name)
+            return class_name(value)
+        except (AttributeError, BundleException):
+            return None
+    return None
@@ -0,0 +1,142 @@
+import logging
+import threading
+from collections import deque
+
+from ..query import compile_query
+from .utils import class_name
+
+logger = logging.getLogger(__name__)
+
+
+class ServiceEvent:
+    REGISTERED = 1
+    MODIFIED = 2
+    UNREGISTERING = 4
+    MODIFIED_ENDMATCH = 8
+
+    __slots__ = ('__type', '__reference')
+
+    def __init__(self, event_type, reference):
+        self.__type = event_type
+        self.__reference = reference
+
+    @property
+    def type(self):
+        return self.__type
+
+    @property
+    def reference(self):
+        return self.__reference
+
+    def __str__(self):
+        return 'ServiceEvent(type={}, reference={})'.format(
+            self.__type, self.__reference)
+
+
+class EventDispatcher:
+    # callbacks queued by registry writers under lock and called later in
+    # queue order, without any lock held, by one thread at a time
+    def __init__(self):
+        self.__queue = deque()
+        self.__condition = threading.Condition()
+        self.__owner = None
+        self.__queued = 0
+        # all callbacks up to done are called, later ones may be called
+        # out of order by nested dispatch
+        self.__done = 0
+        self.__called = set()
+        self.__local = threading.local()
+
+    def put(self, callback, *args):
+        with self.__condition:
+            self.__queued += 1
+            self.__queue.append((self.__queued, callback, args))
+            self.__local.ticket = self.__queued
+
+    def dispatch(self):
+        # returns when callbacks queued by this thread are called
+        thread = threading.get_ident()
+        with self.__condition:
+            target = getattr(self.__local, 'ticket', 0)
+            while self.__owner not in (None, thread):
+                if self.__done >= target:
+                    return
+                self.__condition.wait()
+            owner = self.__owner
+            self.__owner = thread
+        try:
+            while True:
+                with self.__condition:
+                    if not self.__queue:
+                        return
+                    ticket, callback, args = self.__queue.popleft()
+                try:
+                    callback(*args)
+                except Exception:
+                    logger.exception(
+                        'Error in registry callback: %s', callback)
+                finally:
+                    with self.__condition:
+                        self.__called.add(ticket)
+                        while self.__done + 1 in self.__called:
+                            self.__done += 1
+                            self.__called.remove(self.__done)
+                        self.__condition.notify_all()
+        finally:
+            with self.__condition:
+                # nested dispatch of callback keeps this thread owner
+                self.__owner = owner
+                if owner is None:
+                    self.__condition.notify_all()
+
+
+class ServiceListeners:
+    def __init__(self, schema=None, dispatcher=None):
+        self.__schema = schema
+        self.__listeners = ()
+        self.__dispatcher = dispatcher or EventDispatcher()
+
+    @property
+    def dispatcher(self):
+        return self.__dispatcher
+
+    def add(self, bundle, listener, clazz=None, filter=None):
+        spec = None if clazz is None else class_name(clazz)
+        matcher = compile_query(filter, self.__schema)
+        # replaced (not mutated) so dispatching may iterate without copy
+        self.__listeners += (_Listener(bundle, listener, spec, matcher), )
+
+    def remove(self, listener):
+        listeners = tuple(
+            item for item in self.__listeners if item.listener is not listener)
+        removed = len(listeners) != len(self.__listeners)
+        self.__listeners = listeners
+        return removed
+
+    def remove_bundle(self, bundle):
+        self.__listeners = tuple(
+            item for item in self.__listeners if item.bundle is not bundle)
+
+    def fire(self, event_type, reference, previous=None):
+        properties = reference.get_properties()
+        classes = reference.specs
+        for item in self.__listeners:
+            if item.spec is not None and item.spec not in classes:
+                continue
+            if item.matcher(properties):
+                event = ServiceEvent(event_type, reference)
+            elif previous is not None and item.matcher(previous):
+                event = ServiceEvent(ServiceEvent.MODIFIED_ENDMATCH, reference)
+            else:
+                continue
+            self.__dispatcher.put(item.listener.service_changed, event)
+
+
+class _Listener:
+    __slots__ = ('bundle', 'listener', 'spec', 'matcher')
+
+    def __init__(self, bundle, listener, spec, matcher):
+        self.bundle = bundle
+        self.listener = listener
+        self.spec = spec
+        self.matcher = matcher
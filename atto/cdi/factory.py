@@ -0,0 +1,23 @@
+SERVICE_SCOPE = 'service.scope'
+
+SCOPE_SINGLETON = 'singleton'
+SCOPE_BUNDLE = 'bundle'
+SCOPE_PROTOTYPE = 'prototype'
+
+SCOPES = (SCOPE_SINGLETON, SCOPE_BUNDLE, SCOPE_PROTOTYPE)
+
+
+class ServiceFactory:
+    def get_service(self, bundle, registration):
+        raise NotImplementedError
+
+    def unget_service(self, bundle, registration, service):
+        pass
+
+
+class CallableFactory(ServiceFactory):
+    def __init__(self, func):
+        self.func = func
+
+    def get_service(self, bundle, registration):
+        return self.func()
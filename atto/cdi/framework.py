@@ -1,66 +1,182 @@
 import asyncio
 import importlib
+import importlib.util
 import logging
 import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 
 
-from atto_api.cdi.consts import ACTIVATOR
+from atto_api.cdi.consts import ACTIVATOR, OBJECTCLASS
 
 from .bundle import Bundle, BundleContext
+from .bootcache import BootCache
+from .dependencies import BundleGraph, bundle_metadata
+from .discovery import Manifest, find_bundles, source_metadata
 from .errors import BundleException, FrameworkException
+from .metrics import RegistryMetrics
 from .registry import ServiceReference, ServiceRegistry
+from .timeline import span
+from .utils import classes_name
 
 
 logger = logging.getLogger(__name__)
 
+BUNDLE_STOP_TIMEOUT = 10
+FRAMEWORK_STOP_TIMEOUT = 30
+
+# activator attribute, run its sync start/stop in thread pool
+BLOCKING = 'blocking'
+
 
 class Framework(Bundle):
-    def __init__(self, settings):
+    def __init__(self, settings, timeline=None):
         super().__init__(self, 0, 'atto.framework', sys.modules[__name__])
         self.__settings = settings
+        self.__timeline = timeline
         self.__bundles = {}
+        self.__bundles_names = {}
         self.__states = _States()
         self.__next_id = 1
-        self.__registry = ServiceRegistry(self)
+        self.__executor = None
+        self.__manifest = None
+        self.__boot_cache = None
+        if self.__get_option('BOOT_CACHE'):
+            self.__boot_cache = BootCache(
+                self.__get_option('BOOT_CACHE'), settings)
+        self.__registry = ServiceRegistry(
+            self, self.__get_option('SERVICE_PROPERTIES_SCHEMA'),
+            self.__get_option('REGISTRY_METRICS', False),
+            self.__get_option('REGISTRY_INDEX_MRO', False))
+        if self.__registry.metrics is not None:
+            self.register_service(
+                self, RegistryMetrics, self.__registry.metrics)
+
+    @property
+    def timeline(self):
+        return self.__timeline
 
     def get_property(self, name):
         if name in self.__settings:
             return self.__settings[name]
         raise KeyError('Not found property: "{}"'.format(name))
 
+    def __get_option(self, name, default=None):
+        if name in self.__settings:
+            return self.__settings[name]
+        return default
+
     def install_bundle(self, name, path=None):
         logger.info('Install bungle: "{}" ({})'.format(name, path))
-        for bundle in self.__bundles.values():
-            if bundle.name == name:
-                logger.debug('Already installed bundle: "%s"', name)
-                return
+        if name in self.__bundles_names:
+            logger.debug('Already installed bundle: "%s"', name)
+            return self.__bundles_names[name]
 
-        try:
-            module_ = importlib.import_module(name)
-        except (ImportError, IOError) as ex:
-            raise BundleException(
-                'Error installing bundle "{0}": {1}'.format(name, ex))
         bundle_id = self.__next_id
-        bundle = Bundle(self, bundle_id, name, module_)
+        with span(self.__timeline, name, 'install', bundle_id):
+            bundle = self.__install(bundle_id, name)
         self.__bundles[bundle_id] = bundle
+        self.__bundles_names[name] = bundle
         self.__next_id += 1
+        return bundle
+
+    def __install(self, bundle_id, name):
+        # only locate module, it is imported when bundle starts
+        module_ = sys.modules.get(name)
+        spec = None
+        if module_ is None and self.__boot_cache is not None:
+            spec = self.__boot_cache.spec(name)
+        if module_ is None and spec is None:
+            try:
+                spec = importlib.util.find_spec(name)
+            except (ImportError, IOError, ValueError) as ex:
+                raise BundleException(
+                    'Error installing bundle "{0}": {1}'.format(name, ex))
+            if spec is None:
+                raise BundleException(
+                    'Error installing bundle "{0}": module not found'.format(
+                        name))
+            if self.__boot_cache is not None:
+                self.__boot_cache.set_spec(name, spec)
+        return Bundle(self, bundle_id, name, module_, spec)
+
+    def install_package(self, path, recursive=False):
+        logger.info('Install package: "%s"', path)
+        if self.__manifest is None:
+            # empty path keeps manifest only in memory
+            self.__manifest = Manifest(
+                self.__get_option('BUNDLE_MANIFEST') or None)
+        names = find_bundles(path, recursive, self.__manifest)
+        return [self.install_bundle(name) for name in names]
+
+    @property
+    def bundles(self):
+        return list(self.__bundles.values())
+
+    def get_bundle(self, bundle_id):
+        if bundle_id == self.id:
+            return self
+        return self.__bundles.get(bundle_id)
+
+    def get_bundle_by_name(self, name):
+        return self.__bundles_names.get(name)
+
+    async def update_bundle(self, name):
+        bundle = self.__bundles_names.get(name)
+        if bundle is None:
+            raise BundleException('Not installed bundle: "{}"'.format(name))
+        logger.info('Update bundle: "%s"', name)
+        state = self.__states.get(bundle)
+        active = state.is_active()
+        if active:
+            # dependent bundles see services go away by service events
+            try:
+                await self._stop_bundle(bundle)
+            except BundleException:
+                logger.exception('Stoping bundle: "%s"', bundle.name)
+            self.__force_stop(bundle)
+
+        try:
+            with span(self.__timeline, bundle.name, 'import', bundle.id):
+                bundle.reload()
+        finally:
+            # previous version is started again when new can not be imported
+            if active:
+                with span(self.__timeline, bundle.name, 'start', bundle.id):
+                    await self._start_bundle(bundle)
+        return bundle
+
+    def import_times(self):
+        return {bundle.name: bundle.import_time
+                for bundle in self.__bundles.values()
+                if bundle.import_time is not None}
 
     def register_service(self, bundle, clazz, service, properties=None):
         if bundle is None:
             raise BundleException('Invalid registration parameter: bundle')
-        if clazz is None:
-            raise BundleException('Invalid registration parameter: clazz')
-        if service is None:
-            raise BundleException('Invalid registration parameter: service')
-
-        properties = properties.copy() if isinstance(properties, dict) else {}
-
-        registration = self.__registry.register(
-            bundle, clazz, service, properties
-        )
+        clazz, service, properties = _registration_args(
+            clazz, service, properties)
+
+        with span(self.__timeline, 'register', 'service', bundle.id) as args:
+            registration = self.__registry.register(
+                bundle, clazz, service, properties
+            )
+            args['classes'] = registration.get_reference().get_property(
+                OBJECTCLASS)
         return registration
 
-    async def start(self):
+    def register_many(self, bundle, services):
+        if bundle is None:
+            raise BundleException('Invalid registration parameter: bundle')
+        services = [_registration_args(*args) for args in services]
+        with span(self.__timeline, 'register_many', 'service', bundle.id,
+                  count=len(services)):
+            return self.__registry.register_many(bundle, services)
+
+    async def start(self, requires=None):
+        # with requires only bundles providing these classes are started,
+        # together with their dependencies, others are not even imported
         logger.info('Start atto')
         state = self.__states.get(self)
         if state.is_starting() or state.is_active():
@@ -68,13 +184,85 @@ class Framework(Bundle):
             return False
 
         state.starting()
+        declared = {}
         for bundle in self.__bundles.copy().values():
-            try:
-                await self._start_bundle(bundle)
-            except BundleException:
-                logger.exception('Starting bundle: "%s"', bundle.name)
+            metadata = self.__metadata(bundle)
+            if metadata is not None:
+                declared[bundle] = metadata
+        try:
+            graph = BundleGraph(declared, declared.__getitem__)
+            order = graph.order()
+        except FrameworkException:
+            state.resolved()
+            raise
+        if requires is not None:
+            order = _providers(graph, order, declared, classes_name(requires))
+
+        # independent bundles are started concurrently
+        tasks = {}
+        for bundle in order:
+            tasks[bundle] = asyncio.ensure_future(self.__start_after(
+                bundle, [(tasks[dependency], dependency, required)
+                         for dependency, required
+                         in graph.dependencies(bundle).items()]))
+        if self.__boot_cache is not None:
+            self.__boot_cache.save()
+        with span(self.__timeline, 'start', 'framework'):
+            await asyncio.gather(*tasks.values())
         state.active()
 
+    def __metadata(self, bundle, load=True):
+        # dependencies are read from cache or module source when possible,
+        # so bundle is imported only after its dependencies are started
+        cache = self.__boot_cache
+        metadata = None if cache is None else cache.metadata(bundle)
+        if metadata is not None:
+            return metadata
+        if not bundle.loaded and bundle.origin is not None:
+            metadata = source_metadata(
+                bundle.origin, bundle.name, bundle.is_package)
+        if metadata is None:
+            if not bundle.loaded and not load:
+                return None, None
+            if not bundle.loaded and not self.__load(bundle):
+                return None
+            metadata = bundle_metadata(bundle)
+        if cache is not None:
+            cache.set_metadata(bundle, metadata)
+        return metadata
+
+    def __load(self, bundle):
+        try:
+            with span(self.__timeline, bundle.name, 'import', bundle.id):
+                bundle.load()
+        except BundleException:
+            logger.exception('Starting bundle: "%s"', bundle.name)
+            return False
+        logger.debug('Imported bundle "%s" (%.3fs)',
+                     bundle.name, bundle.import_time or 0)
+        return True
+
+    async def __start_after(self, bundle, dependencies):
+        failed = None
+        for task, dependency, required in dependencies:
+            # wait for all, bundles depending on this one rely on order
+            started = await task
+            if required and not started and failed is None:
+                failed = dependency
+        if failed is not None:
+            logger.error('Not started bundle "%s", required bundle "%s" '
+                         'failed', bundle.name, failed.name)
+            return False
+        if not self.__load(bundle):
+            return False
+        try:
+            with span(self.__timeline, bundle.name, 'start', bundle.id):
+                await self._start_bundle(bundle)
+        except BundleException:
+            logger.exception('Starting bundle: "%s"', bundle.name)
+            return False
+        return True
+
     async def stop(self):
         logger.info('Stop atto')
         state = self.__states.get(self)
@@ -83,17 +271,71 @@ class Framework(Bundle):
             logger.debug('Framewok not started')
             return False
         state.stopping()
-        bundles = list(self.__bundles.copy().values())
-        for bundle in bundles[::-1]:
-            if self.__states.get(bundle).is_active():
-                try:
-                    await self._stop_bundle(bundle)
-                except BundleException:
-                    logger.exception('Stoping bundle: "%s"', bundle.name)
-            else:
-                logger.debug('Bundle "%s" already stoped', bundle)
-
+        graph = self.__stop_graph()
+        loop = asyncio.get_event_loop()
+        deadline = loop.time() + self.__get_option(
+            'FRAMEWORK_STOP_TIMEOUT', FRAMEWORK_STOP_TIMEOUT)
+
+        # bundle is stopped after all bundles depending on it
+        tasks = {}
+        for bundle in reversed(graph.order()):
+            tasks[bundle] = asyncio.ensure_future(self.__stop_after(
+                bundle, [tasks[dependent]
+                         for dependent in graph.dependents(bundle)],
+                deadline))
+        with span(self.__timeline, 'stop', 'framework'):
+            report = await asyncio.gather(*tasks.values())
+        self.__shutdown_executor()
+        for result in sorted(report, key=lambda item: -item.duration):
+            logger.info('Stop bundle "%s": %s (%.3fs)',
+                        result.name, result.status, result.duration)
         state.resolved()
+        return report
+
+    def __stop_graph(self):
+        # built again, bundles could be installed or updated since start
+        bundles = list(self.__bundles.values())
+        graph = BundleGraph(
+            bundles, lambda bundle: self.__metadata(bundle, False))
+        try:
+            graph.order()
+        except FrameworkException:
+            logger.exception('Stopping bundles in reverse install order')
+            graph = BundleGraph(bundles, lambda bundle: (None, None))
+        return graph
+
+    async def __stop_after(self, bundle, dependents, deadline):
+        if dependents:
+            await asyncio.wait(dependents)
+        if not self.__states.get(bundle).is_active():
+            logger.debug('Bundle "%s" already stoped', bundle)
+            return StopResult(bundle.name, StopResult.SKIPPED, 0.0)
+
+        loop = asyncio.get_event_loop()
+        timeout = min(
+            self.__get_option('BUNDLE_STOP_TIMEOUT', BUNDLE_STOP_TIMEOUT),
+            deadline - loop.time())
+        start = time.perf_counter()
+        status = StopResult.STOPPED
+        with span(self.__timeline, bundle.name, 'stop', bundle.id) as args:
+            try:
+                await asyncio.wait_for(
+                    self._stop_bundle(bundle), max(timeout, 0))
+            except asyncio.TimeoutError:
+                logger.error('Timeout stopping bundle: "%s"', bundle.name)
+                self.__force_stop(bundle)
+                status = StopResult.TIMEOUT
+            except BundleException:
+                logger.exception('Stoping bundle: "%s"', bundle.name)
+                status = StopResult.FAILED
+            args['status'] = status
+        return StopResult(bundle.name, status, time.perf_counter() - start)
+
+    def __force_stop(self, bundle):
+        self.__registry.remove_listeners(bundle)
+        self.__registry.unregister_services(bundle)
+        self.__registry.unget_services(bundle)
+        self.__states.get(bundle).resolved()
 
     def get_service_reference(self, clazz, filter=None):
         return self.__registry.find_service_reference(clazz, filter)
@@ -109,6 +351,18 @@ class Framework(Bundle):
 
         return self.__registry.get_service(bundle, reference)
 
+    def unget_service(self, bundle, reference, service=None):
+        return self.__registry.unget_service(bundle, reference, service)
+
+    def add_service_listener(self, bundle, listener, clazz=None,
+                             filter=None, replay=False):
+        if not hasattr(listener, 'service_changed'):
+            raise TypeError('Expected listener with "service_changed" method')
+        self.__registry.add_listener(bundle, listener, clazz, filter, replay)
+
+    def remove_service_listener(self, listener):
+        return self.__registry.remove_listener(listener)
+
     async def _start_bundle(self, bundle):
         state = self.__states.get(bundle)
 
@@ -117,10 +371,7 @@ class Framework(Bundle):
         start_method = self.__get_activator_method(bundle, 'start')
         if start_method:
             try:
-                if asyncio.iscoroutinefunction(start_method):
-                    await start_method(BundleContext(self, bundle))
-                else:
-                    start_method(BundleContext(self, bundle))
+                await self.__call_activator(bundle, start_method)
             except (FrameworkException, BundleException):
                 state.rollback()
                 logger.exception('Error raised while starting: %s', bundle)
@@ -137,12 +388,7 @@ class Framework(Bundle):
         method = self.__get_activator_method(bundle, 'stop')
         if method:
             try:
-                if asyncio.iscoroutinefunction(method):
-                    await method(BundleContext(self, bundle))
-                else:
-                    method(BundleContext(self, bundle))
-                self.__registry.unregister_services(bundle)
-                self.__registry.unget_services(bundle)
+                await self.__call_activator(bundle, method)
             except (FrameworkException, BundleException):
                 state.rollback()
                 logger.exception(
@@ -154,8 +400,44 @@ class Framework(Bundle):
                     'Error raised while starting bundle: %s', bundle)
                 raise BundleException(str(ex))
 
+        # bundle without stop method leaves its services too
+        self.__registry.remove_listeners(bundle)
+        self.__registry.unregister_services(bundle)
+        self.__registry.unget_services(bundle)
         state.resolved()
 
+    async def __call_activator(self, bundle, method):
+        context = BundleContext(self, bundle)
+        if asyncio.iscoroutinefunction(method):
+            await method(context)
+        elif self.__is_blocking(bundle):
+            # keep event loop (and other bundles) running meanwhile
+            loop = asyncio.get_event_loop()
+            await loop.run_in_executor(self.__get_executor(), method, context)
+        else:
+            method(context)
+
+    def __is_blocking(self, bundle):
+        activator = getattr(bundle.module, ACTIVATOR, None)
+        blocking = getattr(activator, BLOCKING, None)
+        if blocking is None:
+            return self.__get_option('ACTIVATOR_EXECUTOR', False)
+        return blocking
+
+    def __get_executor(self):
+        if self.__executor is None:
+            # 0 workers selects default size of executor
+            self.__executor = ThreadPoolExecutor(
+                self.__get_option('ACTIVATOR_EXECUTOR_WORKERS') or None,
+                thread_name_prefix='atto-activator')
+        return self.__executor
+
+    def __shutdown_executor(self):
+        if self.__executor is not None:
+            # threads of timed out activators can not be interrupted
+            self.__executor.shutdown(wait=False)
+            self.__executor = None
+
     def __get_activator_method(self, bundle, name):
         activator = getattr(bundle.module, ACTIVATOR, None)
         if activator:
@@ -163,6 +445,34 @@ class Framework(Bundle):
         return None
 
 
+class StopResult(namedtuple('StopResult', 'name status duration')):
+    __slots__ = ()
+
+    STOPPED = 'stopped'
+    FAILED = 'failed'
+    TIMEOUT = 'timeout'
+    SKIPPED = 'skipped'
+
+
+def _providers(graph, order, declared, specs):
+    # bundles without metadata may provide anything
+    needed = {bundle for bundle, (requires, provides) in declared.items()
+              if requires is None or set(provides) & set(specs)}
+    for bundle in reversed(order):
+        if bundle in needed:
+            needed.update(graph.dependencies(bundle))
+    return [bundle for bundle in order if bundle in needed]
+
+
+def _registration_args(clazz, service, properties=None):
+    if clazz is None:
+        raise BundleException('Invalid registration parameter: clazz')
+    if service is None:
+        raise BundleException('Invalid registration parameter: service')
+    properties = properties if isinstance(properties, dict) else {}
+    return clazz, service, properties
+
+
 class _States:
     def __init__(self):
         self.map = {}
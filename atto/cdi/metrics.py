@@ -0,0 +1,99 @@
+import bisect
+import threading
+
+from atto_api.cdi.consts import SERVICE_ID
+
+# upper bounds of latency buckets in seconds, last one catches everything
+LATENCY_BUCKETS = (
+    1e-6, 2e-6, 5e-6, 1e-5, 2e-5, 5e-5, 1e-4, 2e-4, 5e-4,
+    1e-3, 2e-3, 5e-3, 1e-2, float('inf'),
+)
+
+MAX_FILTERS = 1000
+OTHER_FILTERS = '<other>'
+# lookups of all services, without class
+ANY_CLASS = '<any>'
+
+
+class RegistryMetrics:
+    def __init__(self, registry):
+        self.__registry = registry
+        self.__lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.__lock:
+            self.__classes = {}
+            self.__filters = {}
+            self.__hits = 0
+            self.__misses = 0
+            self.__latency = {
+                'lookup': [0] * len(LATENCY_BUCKETS),
+                'get_service': [0] * len(LATENCY_BUCKETS),
+            }
+            self.__services = {}
+
+    def record_lookup(self, name, filter, hit, duration):
+        if filter is not None and not isinstance(filter, str):
+            filter = str(filter)
+        if name is None:
+            name = ANY_CLASS
+        bucket = bisect.bisect_left(LATENCY_BUCKETS, duration)
+        with self.__lock:
+            self.__classes[name] = self.__classes.get(name, 0) + 1
+            if filter is not None:
+                if filter not in self.__filters and \
+                        len(self.__filters) >= MAX_FILTERS:
+                    filter = OTHER_FILTERS
+                self.__filters[filter] = self.__filters.get(filter, 0) + 1
+            if hit:
+                self.__hits += 1
+            else:
+                self.__misses += 1
+            self.__latency['lookup'][bucket] += 1
+
+    def record_get_service(self, bundle, reference, duration):
+        bucket = bisect.bisect_left(LATENCY_BUCKETS, duration)
+        key = (reference.get_property(SERVICE_ID), bundle.name)
+        with self.__lock:
+            self.__services[key] = self.__services.get(key, 0) + 1
+            self.__latency['get_service'][bucket] += 1
+
+    def hot_classes(self, limit=10):
+        with self.__lock:
+            items = [item for item in self.__classes.items()
+                     if item[0] != ANY_CLASS]
+        items.sort(key=lambda item: item[1], reverse=True)
+        return items[:limit]
+
+    def as_dict(self):
+        with self.__lock:
+            lookups = self.__hits + self.__misses
+            return {
+                'lookups': {
+                    'total': lookups,
+                    'cache_hits': self.__hits,
+                    'cache_misses': self.__misses,
+                    'cache_hit_rate': self.__hits / lookups if lookups else 0,
+                    'classes': dict(self.__classes),
+                    'filters': dict(self.__filters),
+                },
+                'latency': {
+                    'buckets': [_bucket_name(bound)
+                                for bound in LATENCY_BUCKETS],
+                    'lookup': list(self.__latency['lookup']),
+                    'get_service': list(self.__latency['get_service']),
+                },
+                'get_service': [{
+                    'service_id': service_id,
+                    'bundle': bundle,
+                    'count': count,
+                } for (service_id, bundle), count in self.__services.items()],
+                'use_counts': self.__registry.use_counts(),
+            }
+
+
+def _bucket_name(bound):
+    if bound == float('inf'):
+        return '+inf'
+    return '{:g}us'.format(bound * 1e6)
@@ -1,112 +1,500 @@
+import bisect
+import contextlib
+import logging
+import threading
+import time
+from types import MappingProxyType
+
 from atto_api.cdi.consts import (OBJECTCLASS, SERVICE_BUNDLE_ID, SERVICE_ID,
                                  SERVICE_RANKING)
 
-from ..query import create_query
+from ..query import compile_query, create_query, filter_indices, nodes
+from ..query.cache import query_key
+from ..query.schema import Schema, coerce
 from .errors import BundleException
-from .utils import class_name, classes_name
+from .events import EventDispatcher, ServiceEvent, ServiceListeners
+from .factory import (SCOPE_BUNDLE, SCOPE_PROTOTYPE, SCOPE_SINGLETON, SCOPES,
+                      SERVICE_SCOPE, ServiceFactory)
+from .metrics import RegistryMetrics
+from .utils import class_name, classes_mro_names, classes_name
+
+
+logger = logging.getLogger(__name__)
+
+LOOKUPS_CACHE_SIZE = 1024
+
+PROPERTIES_SCHEMA = {
+    SERVICE_ID: int,
+    SERVICE_BUNDLE_ID: int,
+    SERVICE_RANKING: int,
+}
 
 
 class ServiceRegistry:
-    def __init__(self, framework):
+    def __init__(self, framework, schema=None, metrics=False,
+                 index_mro=False):
         self.__framework = framework
+        self.__index_mro = index_mro
+        self.__schema = Schema(PROPERTIES_SCHEMA, **(schema or {}))
         self.__next_service_id = 1
         self.__serivces = {}
         self.__services_classes = {}
         self.__serivces_bundles = {}
+        self.__unregistering = set()
+        self.__index = _PropertiesIndex(self.__schema)
+        self.__dispatcher = EventDispatcher()
+        self.__listeners = ServiceListeners(self.__schema, self.__dispatcher)
+        # writers are serialized, readers never take the lock: they use
+        # published snapshot or compute lookup optimistically and check by
+        # sequence (odd while writer changes state) that nothing changed
+        self.__lock = threading.RLock()
+        self.__depth = 0
+        self.__owner = None
+        self.__sequence = 0
+        self.__usage_lock = threading.Lock()
+        self.__snapshot = _Snapshot(0)
+        self.__metrics = RegistryMetrics(self) if metrics else None
+
+    @property
+    def metrics(self):
+        return self.__metrics
+
+    @contextlib.contextmanager
+    def __write(self):
+        with self.__lock:
+            self.__depth += 1
+            if self.__depth == 1:
+                self.__owner = threading.get_ident()
+                self.__sequence += 1
+            try:
+                yield
+            finally:
+                self.__depth -= 1
+                if not self.__depth:
+                    self.__sequence += 1
+                    self.__owner = None
+            outer = not self.__depth
+        if outer:
+            # listeners and factories are called without registry lock
+            self.__dispatcher.dispatch()
+
+    def add_listener(self, bundle, listener, clazz=None, filter=None,
+                     replay=False):
+        with self.__write():
+            self.__listeners.add(bundle, listener, clazz, filter)
+            if replay:
+                # queued under lock, so no event is lost or delivered twice
+                name = None if clazz is None else class_name(clazz)
+                for ref in self.__find_service_references(name, filter):
+                    self.__dispatcher.put(
+                        listener.service_changed,
+                        ServiceEvent(ServiceEvent.REGISTERED, ref))
+
+    def remove_listener(self, listener):
+        with self.__write():
+            return self.__listeners.remove(listener)
+
+    def remove_listeners(self, bundle):
+        with self.__write():
+            self.__listeners.remove_bundle(bundle)
 
     def register(self, bundle, clazz, service, properties):
-        service_id = self.__next_service_id
-        self.__next_service_id += 1
+        with self.__write():
+            ref = self.__add_reference(bundle, *self.__check_registration(
+                bundle, clazz, service, properties))
+            for spec in ref.specs:
+                refs = self.__services_classes.setdefault(spec, [])
+                bisect.insort(refs, ref)
+            self.__changed()
+            self.__listeners.fire(ServiceEvent.REGISTERED, ref)
+            return ServiceRegistration(self, ref)
+
+    def register_many(self, bundle, services):
+        with self.__write():
+            # all are checked first, so failed batch changes nothing
+            checked = [
+                self.__check_registration(bundle, clazz, service, properties)
+                for clazz, service, properties in services
+            ]
+            refs = [self.__add_reference(bundle, *item) for item in checked]
+            changed = set()
+            for ref in refs:
+                for spec in ref.specs:
+                    self.__services_classes.setdefault(spec, []).append(ref)
+                    changed.add(spec)
+            for spec in changed:
+                self.__services_classes[spec].sort()
+            self.__changed()
+            for ref in refs:
+                self.__listeners.fire(ServiceEvent.REGISTERED, ref)
+            return [ServiceRegistration(self, ref) for ref in refs]
 
-        classes = classes_name(clazz)
-        properties[OBJECTCLASS] = classes
-        properties[SERVICE_ID] = service_id
+    def __check_registration(self, bundle, clazz, service, properties):
+        # caller keeps its dict, reference properties are read only view
+        properties = dict(properties or {})
+        properties[OBJECTCLASS] = classes_name(clazz)
         properties[SERVICE_BUNDLE_ID] = bundle.id
 
         if SERVICE_RANKING not in properties:
             properties[SERVICE_RANKING] = 0
 
-        ref = ServiceReference(bundle, properties)
+        if isinstance(service, ServiceFactory):
+            scope = properties.setdefault(SERVICE_SCOPE, SCOPE_BUNDLE)
+            if scope not in SCOPES:
+                raise BundleException(
+                    'Unknown service scope: "{}"'.format(scope))
+
+        # with MRO index service is found also by its base classes
+        specs = classes_mro_names(clazz) if self.__index_mro else None
+        return service, properties, specs
+
+    def __add_reference(self, bundle, service, properties, specs):
+        service_id = self.__next_service_id
+        self.__next_service_id += 1
+        properties[SERVICE_ID] = service_id
+
+        ref = ServiceReference(bundle, properties, specs)
+        if isinstance(service, ServiceFactory):
+            service = _FactoryHolder(service, properties[SERVICE_SCOPE],
+                                     ServiceRegistration(self, ref))
         self.__serivces[ref] = service
-        for spec in classes:
-            refs = self.__services_classes.setdefault(spec, [])
-            refs.append(ref)
-            refs.sort()
-        self.__serivces_bundles.setdefault(bundle, []).append(ref)
-        return ServiceRegistration(self, ref)
+        self.__serivces_bundles.setdefault(bundle, {})[ref] = None
+        self.__index.add(ref, ref.get_properties())
+        return ref
 
     def unregister(self, register):
         self._unregister_service(register.get_reference())
 
     def _unregister_service(self, reference):
-        service = self.__serivces.pop(reference)
-        for spec in reference.get_property(OBJECTCLASS):
-            spec_services = self.__services_classes[spec]
-            if reference in spec_services:
-                spec_services.remove(reference)
-        bundle = reference.get_bundle()
-        if bundle in self.__serivces_bundles:
-            self.__serivces_bundles[bundle].remove(reference)
-        return service
+        # listeners get UNREGISTERING while service can be still used, it
+        # is delivered when first write ends, before service is removed
+        with self.__write():
+            if reference not in self.__serivces or \
+                    reference in self.__unregistering:
+                raise BundleException(
+                    'Service not registered: {}'.format(reference))
+            self.__unregistering.add(reference)
+            self.__listeners.fire(ServiceEvent.UNREGISTERING, reference)
+        with self.__write():
+            self.__unregistering.discard(reference)
+            service = self.__serivces.pop(reference)
+            if isinstance(service, _FactoryHolder):
+                self.__dispatcher.put(service.release_all)
+                service = service.factory
+            self.__index.remove(reference, reference.get_properties())
+            for spec in reference.specs:
+                self.__remove_sorted(self.__services_classes[spec], reference)
+            bundle = reference.get_bundle()
+            if bundle in self.__serivces_bundles:
+                self.__serivces_bundles[bundle].pop(reference, None)
+            self.__changed()
+            return service
+
+    def update_properties(self, reference, properties):
+        with self.__write():
+            if reference not in self.__serivces:
+                raise BundleException(
+                    'Service not registered: {}'.format(reference))
+            properties = dict(properties)
+            for name in _FIXED_PROPERTIES:
+                if name in reference.get_properties():
+                    properties[name] = reference.get_property(name)
+            properties.setdefault(SERVICE_RANKING, 0)
+
+            classes = reference.specs
+            previous = reference.get_properties()
+            for spec in classes:
+                self.__remove_sorted(self.__services_classes[spec], reference)
+            self.__index.remove(reference, previous)
+            reference._set_properties(properties)
+            self.__index.add(reference, reference.get_properties())
+            for spec in classes:
+                bisect.insort(self.__services_classes[spec], reference)
+            self.__changed()
+            self.__listeners.fire(ServiceEvent.MODIFIED, reference, previous)
 
     def unregister_services(self, bundle):
-        if bundle in self.__serivces_bundles:
-            refs = self.__serivces_bundles[bundle][:]
-            for ref in refs:
+        with self.__lock:
+            refs = list(self.__serivces_bundles.get(bundle, ()))
+        # one by one, so every UNREGISTERING is delivered before removal
+        for ref in refs:
+            try:
                 self._unregister_service(ref)
+            except BundleException:
+                logger.debug('Service already unregistered: %s', ref)
 
     def unget_services(self, bundle):
-        if bundle in self.__serivces_bundles:
-            refs = self.__serivces_bundles[bundle][:]
-            for ref in refs:
-                self.unget_service(bundle, ref)
+        with self.__write():
+            if bundle in self.__serivces_bundles:
+                refs = list(self.__serivces_bundles[bundle])
+                for ref in refs:
+                    self.unget_service(bundle, ref)
+            # instances created by factories for stopped bundle
+            for holder in list(self.__serivces.values()):
+                if isinstance(holder, _FactoryHolder):
+                    self.__dispatcher.put(holder.release, bundle)
+
+    @property
+    def generation(self):
+        return self.__snapshot.generation
 
     def find_service_references(self, clazz=None, filter=None,
                                 only_first=False):
-        if clazz is None and filter is None:
-            return sorted(self.__serivces.keys())
-        refs = []
-        if clazz is not None:
-            name = class_name(clazz)
-            refs = self.__services_classes.get(name, [])
-
-        if refs and filter is not None:
-            matcher = create_query(filter)
-            refs = tuple(ref for ref in refs if matcher.match(
-                ref.get_properties()))
+        metrics = self.__metrics
+        if metrics is not None:
+            start = time.perf_counter()
+        name = None if clazz is None else class_name(clazz)
+        key = _lookup_key(name, filter)
+        try:
+            refs = self.__snapshot.lookups[key]
+            hit = True
+        except KeyError:
+            hit = False
+            refs = self.__optimistic_lookup(name, filter, key)
+        if metrics is not None:
+            metrics.record_lookup(
+                name, filter, hit, time.perf_counter() - start)
         if only_first:
             return refs[0] if refs else None
-        refs.sort()
         return refs
 
+    def __optimistic_lookup(self, name, filter, key):
+        if self.__owner == threading.get_ident():
+            # lookup from listener or factory of running write
+            return self.__find_service_references(name, filter)
+        while True:
+            sequence = self.__sequence
+            if sequence % 2:
+                # writer is changing state, let it finish
+                time.sleep(0)
+                continue
+            snapshot = self.__snapshot
+            try:
+                refs = self.__find_service_references(name, filter)
+            except Exception:
+                if self.__sequence == sequence:
+                    raise
+                continue
+            if self.__sequence != sequence:
+                continue
+            if key is not None:
+                lookups = snapshot.lookups
+                if len(lookups) >= LOOKUPS_CACHE_SIZE:
+                    lookups.clear()
+                lookups[key] = refs
+            return refs
+
+    def __find_service_references(self, name, filter):
+        if name is None:
+            refs = self.__serivces.keys()
+            if filter is not None:
+                refs = self.__index.candidates(create_query(filter), refs)
+            refs = sorted(refs)
+            if refs and filter is not None:
+                # scan of all services, evaluate filter column by column
+                indices = filter_indices(
+                    filter, [ref.get_properties() for ref in refs],
+                    self.__schema)
+                refs = [refs[index] for index in indices]
+        else:
+            refs = self.__services_classes.get(name, ())
+            if refs and filter is not None:
+                candidates = self.__index.candidates(
+                    create_query(filter), refs)
+                if candidates is not refs:
+                    refs = sorted(ref for ref in candidates
+                                  if name in ref.specs)
+                matcher = compile_query(filter, self.__schema)
+                refs = [ref for ref in refs if matcher(ref.get_properties())]
+        return tuple(refs)
+
+    @staticmethod
+    def __remove_sorted(refs, reference):
+        index = bisect.bisect_left(refs, reference)
+        if index < len(refs) and refs[index] == reference:
+            del refs[index]
+
+    def __changed(self):
+        # swap of reference is atomic, readers see old or new snapshot
+        self.__snapshot = _Snapshot(self.__snapshot.generation + 1)
+
     def find_service_reference(self, clazz, filter=None):
         return self.find_service_references(clazz, filter, True)
 
     def get_service(self, bundle, reference):
+        metrics = self.__metrics
+        if metrics is not None:
+            start = time.perf_counter()
         try:
             service = self.__serivces[reference]
-            reference.used_by(bundle)
-            return service
         except KeyError:
             raise BundleException(
                 "Service not found fo reference: {0}".format(reference))
+        if isinstance(service, _FactoryHolder):
+            service = service.get(bundle)
+        with self.__usage_lock:
+            reference.used_by(bundle)
+        if metrics is not None:
+            metrics.record_get_service(
+                bundle, reference, time.perf_counter() - start)
+        return service
 
-    def unget_service(self, bundle, reference):
+    def use_counts(self):
+        with self.__usage_lock:
+            return {
+                ref.get_property(SERVICE_ID): {
+                    bundle.name: count
+                    for bundle, count in ref.get_use_counts().items()
+                }
+                for ref in list(self.__serivces) if ref.get_use_counts()
+            }
+
+    def unget_service(self, bundle, reference, service=None):
         try:
-            service = self.__serivces[reference]
+            holder = self.__serivces[reference]
+        except KeyError:
+            return None
+        with self.__usage_lock:
             reference.unused_by(bundle)
+        if isinstance(holder, _FactoryHolder):
+            holder.unget(bundle, service)
             return service
-        except KeyError:
-            pass
+        return holder
+
+
+class _Snapshot:
+    __slots__ = ('generation', 'lookups')
+
+    def __init__(self, generation):
+        self.generation = generation
+        # (class, filter) -> tuple of references valid for generation
+        self.lookups = {}
+
+
+class _PropertiesIndex:
+    def __init__(self, schema):
+        self.__schema = schema
+        self.__values = {}
+        self.__present = {}
+        self.__unhashable = {}
+
+    def add(self, ref, properties):
+        for name, value in properties.items():
+            self.__present.setdefault(name, set()).add(ref)
+            values = self.__values.setdefault(name, {})
+            for key in self.__keys(name, value):
+                try:
+                    values.setdefault(key, set()).add(ref)
+                except TypeError:
+                    self.__unhashable.setdefault(name, set()).add(ref)
+
+    def remove(self, ref, properties):
+        for name, value in properties.items():
+            _discard(self.__present, name, ref)
+            _discard(self.__unhashable, name, ref)
+            values = self.__values.get(name, {})
+            for key in self.__keys(name, value):
+                try:
+                    _discard(values, key, ref)
+                except TypeError:
+                    pass
+            if not values:
+                self.__values.pop(name, None)
+
+    def candidates(self, node, refs):
+        # use index only when it narrows given references
+        found = self.__find(node)
+        if found is None or len(found) >= len(refs):
+            return refs
+        return found
+
+    def __find(self, node):
+        node_type = type(node)
+        if node_type is nodes.PresentNode:
+            return self.__present.get(node.name, _EMPTY)
+        if node_type is nodes.EqNode:
+            return self.__find_values(node.name, (node.value, ))
+        if node_type is nodes.InNode:
+            return self.__find_values(node.name, node.value)
+        if node_type is nodes.OrNode:
+            found = set()
+            for item in node.value:
+                refs = self.__find(item)
+                if refs is None:
+                    return None
+                found.update(refs)
+            return found
+        if node_type is nodes.AndNode:
+            # the most selective clause, others are checked by matcher
+            found = None
+            for item in node.value:
+                refs = self.__find(item)
+                if refs is not None and (found is None or
+                                         len(refs) < len(found)):
+                    found = refs
+            return found
+        return None
+
+    def __find_values(self, name, values):
+        index = self.__values.get(name, {})
+        found = set(self.__unhashable.get(name, _EMPTY))
+        for value in values:
+            key = self.__key(name, value)
+            try:
+                found.update(index.get(key, _EMPTY))
+            except TypeError:
+                return None
+        return found
+
+    def __keys(self, name, value):
+        if isinstance(value, (list, tuple)):
+            return [self.__key(name, item) for item in value]
+        return [self.__key(name, value)]
+
+    def __key(self, name, value):
+        if name in self.__schema:
+            try:
+                return coerce(self.__schema[name], value)
+            except (TypeError, ValueError):
+                pass
+        return value
+
+
+_FIXED_PROPERTIES = (OBJECTCLASS, SERVICE_ID, SERVICE_BUNDLE_ID, SERVICE_SCOPE)
+
+
+def _lookup_key(name, filter):
+    if filter is None or isinstance(filter, str):
+        return name, filter
+    if isinstance(filter, nodes.Node):
+        # only shared (frozen) queries can not change after lookup
+        return (name, filter) if filter._frozen else None
+    key = query_key(filter)
+    return None if key is None else (name, key)
+
+
+def _discard(index, key, ref):
+    refs = index.get(key)
+    if refs is not None:
+        refs.discard(ref)
+        if not refs:
+            del index[key]
+
+
+_EMPTY = frozenset()
 
 
 class ServiceReference:
-    def __init__(self, bundle, properties):
-        self.__properties = properties
+    __slots__ = ('__properties', '__bundle', '__service_id', '__sort_key',
+                 '__using_bundles', '__version', '__specs')
+
+    def __init__(self, bundle, properties, specs=None):
         self.__bundle = bundle
         self.__service_id = properties[SERVICE_ID]
-        self.__sort_key = self.__compute_sort_key()
-        self.__using_bundles = {}
+        self.__specs = specs or tuple(properties[OBJECTCLASS])
+        self.__using_bundles = None
+        self.__version = 0
+        self._set_properties(properties)
 
     def get_bundle(self):
         return self.__bundle
@@ -115,19 +503,40 @@ class ServiceReference:
         return self.__properties.get(name)
 
     def get_properties(self):
-        return self.__properties.copy()
+        return self.__properties
+
+    @property
+    def version(self):
+        return self.__version
+
+    @property
+    def specs(self):
+        return self.__specs
+
+    def _set_properties(self, properties):
+        self.__properties = MappingProxyType(properties)
+        self.__sort_key = self.__compute_sort_key()
+        self.__version += 1
 
     def unused_by(self, bundle):
         if bundle is None or bundle is self.__bundle:
             return
-        if bundle in self.__using_bundles:
+        if self.__using_bundles and bundle in self.__using_bundles:
             self.__using_bundles[bundle].dec()
             if not self.__using_bundles[bundle].is_used():
                 del self.__using_bundles[bundle]
 
+    def get_use_counts(self):
+        if not self.__using_bundles:
+            return {}
+        return {bundle: counter.counter
+                for bundle, counter in self.__using_bundles.items()}
+
     def used_by(self, bundle):
         if bundle is None or bundle is self.__bundle:
             return
+        if self.__using_bundles is None:
+            self.__using_bundles = {}
         self.__using_bundles.setdefault(bundle, _Counter()).inc()
 
     def __compute_sort_key(self):
@@ -137,7 +546,7 @@ class ServiceReference:
     def __str__(self):
         return "ServiceReference(id={0}, Bundle={1}, Classes={2})".format(
                 self.__service_id,
-                self.__bundle.get_bundle_id(),
+                self.__bundle.id,
                 self.__properties[OBJECTCLASS]
             )
 
@@ -164,6 +573,8 @@ class ServiceReference:
 
 
 class ServiceRegistration:
+    __slots__ = ('__registry', '__reference')
+
     def __init__(self, registry, reference):
         self.__registry = registry
         self.__reference = reference
@@ -174,8 +585,114 @@ class ServiceRegistration:
     def get_reference(self):
         return self.__reference
 
+    def set_properties(self, properties):
+        self.__registry.update_properties(self.__reference, properties)
+
+
+class _FactoryHolder:
+    def __init__(self, factory, scope, registration):
+        self.factory = factory
+        self.scope = scope
+        self.registration = registration
+        self.__instances = {}
+        self.__lock = threading.RLock()
+
+    def get(self, bundle):
+        with self.__lock:
+            return self.__get(bundle)
+
+    def unget(self, bundle, service=None):
+        with self.__lock:
+            self.__unget(bundle, service)
+
+    def release(self, bundle):
+        with self.__lock:
+            self.__release_bundle(bundle)
+
+    def release_all(self):
+        with self.__lock:
+            self.__release_all()
+
+    def __get(self, bundle):
+        if self.scope == SCOPE_PROTOTYPE:
+            service = self.__create(bundle)
+            self.__instances.setdefault(bundle, []).append(service)
+            return service
+
+        key = None if self.scope == SCOPE_SINGLETON else bundle
+        try:
+            service, counter = self.__instances[key]
+        except KeyError:
+            service, counter = self.__instances[key] = (
+                self.__create(bundle), _Counter())
+        counter.inc()
+        return service
+
+    def __unget(self, bundle, service):
+        if self.scope == SCOPE_PROTOTYPE:
+            services = self.__instances.get(bundle, [])
+            if service is None or service not in services:
+                return
+            services.remove(service)
+            if not services:
+                del self.__instances[bundle]
+            self.__release(bundle, service)
+            return
+
+        if self.scope == SCOPE_SINGLETON:
+            # shared instance lives until unregistration
+            if None in self.__instances:
+                self.__instances[None][1].dec()
+            return
+
+        if bundle in self.__instances:
+            service, counter = self.__instances[bundle]
+            counter.dec()
+            if not counter.is_used():
+                del self.__instances[bundle]
+                self.__release(bundle, service)
+
+    def __release_bundle(self, bundle):
+        if self.scope == SCOPE_SINGLETON:
+            return
+        item = self.__instances.pop(bundle, None)
+        if item is None:
+            return
+        if self.scope == SCOPE_PROTOTYPE:
+            for service in item:
+                self.__release(bundle, service)
+        else:
+            self.__release(bundle, item[0])
+
+    def __release_all(self):
+        instances, self.__instances = self.__instances, {}
+        for bundle, item in instances.items():
+            if bundle is None:
+                bundle = self.registration.get_reference().get_bundle()
+            if self.scope == SCOPE_PROTOTYPE:
+                for service in item:
+                    self.__release(bundle, service)
+            else:
+                self.__release(bundle, item[0])
+
+    def __create(self, bundle):
+        service = self.factory.get_service(bundle, self.registration)
+        if service is None:
+            raise BundleException(
+                'Service factory returned None: {}'.format(self.factory))
+        return service
+
+    def __release(self, bundle, service):
+        try:
+            self.factory.unget_service(bundle, self.registration, service)
+        except Exception:
+            logger.exception('Error raised while releasing service: %s',
+                             self.factory)
+
 
 class _Counter:
+    __slots__ = ('counter', )
+
     def __init__(self):
         self.counter = 0
 
@@ -0,0 +1,90 @@
+import contextlib
+import os
+import threading
+import time
+from collections import namedtuple
+
+MAIN_TRACK = 0
+
+
+class TimelineEvent(namedtuple('TimelineEvent',
+                               'name category start duration track args')):
+    __slots__ = ()
+
+    def as_dict(self):
+        return {
+            'name': self.name,
+            'category': self.category,
+            'start': self.start,
+            'duration': self.duration,
+            'track': self.track,
+            'args': self.args,
+        }
+
+
+class Timeline:
+    def __init__(self, clock=time.perf_counter):
+        self.__clock = clock
+        self.__origin = clock()
+        self.__events = []
+        self.__lock = threading.Lock()
+
+    def now(self):
+        return self.__clock() - self.__origin
+
+    @contextlib.contextmanager
+    def span(self, name, category, track=MAIN_TRACK, **args):
+        # yielded args may be completed inside of span
+        start = self.now()
+        try:
+            yield args
+        finally:
+            self.record(name, category, start, self.now() - start, track,
+                        args)
+
+    def mark(self, name, category, track=MAIN_TRACK, **args):
+        self.record(name, category, self.now(), 0.0, track, args)
+
+    def record(self, name, category, start, duration, track=MAIN_TRACK,
+               args=None):
+        event = TimelineEvent(name, category, start, duration, track,
+                              args or {})
+        with self.__lock:
+            self.__events.append(event)
+
+    def events(self):
+        with self.__lock:
+            return sorted(self.__events, key=lambda event: event.start)
+
+    def breakdown(self):
+        return sorted(self.events(), key=lambda event: -event.duration)
+
+    def as_dict(self):
+        return [event.as_dict() for event in self.events()]
+
+    def as_trace(self):
+        # chrome://tracing (trace event format), times in microseconds
+        pid = os.getpid()
+        events = []
+        for event in self.events():
+            item = {
+                'name': event.name,
+                'cat': event.category,
+                'ph': 'X',
+                'ts': event.start * 1e6,
+                'dur': event.duration * 1e6,
+                'pid': pid,
+                'tid': event.track,
+                'args': event.args,
+            }
+            if not event.duration:
+                del item['dur']
+                item.update(ph='i', s='t')
+            events.append(item)
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+
+def span(timeline, name, category, track=MAIN_TRACK, **args):
+    if timeline is None:
+        return contextlib.nullcontext(args)
+    return timeline.span(name, category, track, **args)
@@ -0,0 +1,108 @@
+import bisect
+import threading
+
+from .events import ServiceEvent
+
+
+class ServiceTracker:
+    def __init__(self, context, clazz, filter=None):
+        self.__context = context
+        self.__clazz = clazz
+        self.__filter = filter
+        self.__refs = []
+        self.__services = {}
+        self.__lock = threading.Lock()
+        self.__opened = False
+
+    def open(self):
+        if self.__opened:
+            return self
+        self.__opened = True
+        # current services are delivered as REGISTERED events
+        self.__context.add_service_listener(
+            self, self.__clazz, self.__filter, replay=True)
+        return self
+
+    def close(self):
+        if self.__opened:
+            self.__opened = False
+            self.__context.remove_service_listener(self)
+            with self.__lock:
+                self.__refs = []
+                services, self.__services = self.__services, {}
+            self.__release(services)
+
+    def service_changed(self, event):
+        if not self.__opened:
+            # event queued before listener was removed
+            return
+        if event.type == ServiceEvent.REGISTERED:
+            self.__add(event.reference)
+        elif event.type == ServiceEvent.MODIFIED:
+            # ranking could change, also of other references before their
+            # events, so list is sorted again (nearly sorted, so linear)
+            with self.__lock:
+                refs = [ref for ref in self.__refs if ref != event.reference]
+                refs.append(event.reference)
+                self.__refs = sorted(refs)
+        else:
+            self.__remove(event.reference)
+
+    def get_service_references(self):
+        return tuple(self.__refs)
+
+    def get_service_reference(self):
+        refs = self.__refs
+        return refs[0] if refs else None
+
+    def get_service(self, reference=None):
+        # service of tracked reference is kept until it is removed
+        if reference is None:
+            reference = self.get_service_reference()
+            if reference is None:
+                return None
+        try:
+            return self.__services[reference]
+        except KeyError:
+            pass
+        # got without lock, factory may change registry
+        service = self.__context.get_service(reference)
+        with self.__lock:
+            if reference not in self.__refs:
+                # not tracked, use belongs to caller
+                return service
+            cached = self.__services.setdefault(reference, service)
+        if cached is not service:
+            # other thread was faster
+            self.__context.unget_service(reference, service)
+        return cached
+
+    def __len__(self):
+        return len(self.__refs)
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __add(self, reference):
+        with self.__lock:
+            refs = self.__refs
+            if reference not in refs:
+                # new list, readers can keep using previous one
+                refs = refs[:]
+                bisect.insort(refs, reference)
+                self.__refs = refs
+
+    def __remove(self, reference):
+        with self.__lock:
+            self.__refs = [ref for ref in self.__refs if ref != reference]
+            services = {}
+            if reference in self.__services:
+                services[reference] = self.__services.pop(reference)
+        self.__release(services)
+
+    def __release(self, services):
+        for reference, service in services.items():
+            self.__context.unget_service(reference, service)
@@ -1,3 +1,5 @@
+import weakref
+
 from .errors import BundleException
 
 
@@ -15,3 +17,29 @@ def classes_name(classes):
     if isinstance(classes, (tuple, list)):
         return tuple((class_name(clazz) for clazz in classes))
     return (class_name(classes), )
+
+
+_mro_names = weakref.WeakKeyDictionary()
+
+
+def mro_names(clazz):
+    if isinstance(clazz, str):
+        return (clazz, )
+    try:
+        return _mro_names[clazz]
+    except KeyError:
+        pass
+    names = tuple(class_name(base) for base in clazz.__mro__
+                  if base is not object)
+    _mro_names[clazz] = names
+    return names
+
+
+def classes_mro_names(classes):
+    if not isinstance(classes, (tuple, list)):
+        return mro_names(classes)
+    names = {}
+    for clazz in classes:
+        for name in mro_names(clazz):
+            names[name] = None
+    return tuple(names)
@@ -1,4 +1,5 @@
 import asyncio
+import json
 import os
 from functools import wraps
 
@@ -6,6 +7,8 @@ import aiohttp
 
 import click
 
+from .cdi import Timeline
+from .cdi.metrics import ANY_CLASS
 from .main import create_app
 from .models import Users
 from .settings import Settings
@@ -144,6 +147,62 @@ def new(message):
     yoyo_new(message)
 
 
+@cli.command()
+@click.option('--url', default='http://localhost:8080/_atto/metrics',
+              help='Registry metrics URL (METRICS_URL) of running server.')
+@click.option('--output', '-o', type=click.File('w'), default='-')
+@click.option('--top', type=int, default=10,
+              help='Number of most looked up classes to print.')
+def metrics(url, output, top):
+    loop = asyncio.get_event_loop()
+    try:
+        data = loop.run_until_complete(_fetch_json(url))
+    except aiohttp.ClientError as ex:
+        raise click.ClickException(
+            'Can not read metrics from "{}" (is REGISTRY_METRICS = True?): '
+            '{}'.format(url, ex))
+    classes = sorted((item for item in data['lookups']['classes'].items()
+                      if item[0] != ANY_CLASS),
+                     key=lambda item: item[1], reverse=True)
+    for name, count in classes[:top]:
+        click.echo('{:>8} {}'.format(count, name), err=True)
+    json.dump(data, output, indent=2, sort_keys=True)
+
+
+async def _fetch_json(url):
+    async with aiohttp.ClientSession() as session:
+        async with session.get(url) as response:
+            response.raise_for_status()
+            return await response.json()
+
+
+@cli.command('profile-startup')
+@click.option('--output', '-o', type=click.File('w'))
+@click.option('--format', 'output_format', default='json',
+              type=click.Choice(['json', 'trace']),
+              help='Timeline as JSON list or Chrome trace events.')
+@click.option('--top', type=int, default=20,
+              help='Number of the slowest steps to print.')
+def profile_startup(output, output_format, top):
+    timeline = Timeline()
+    loop = asyncio.get_event_loop()
+    app = loop.run_until_complete(create_app(loop, timeline=timeline))
+    loop.run_until_complete(app.startup())
+    startup = timeline.now()
+    loop.run_until_complete(app.cleanup())
+
+    for event in timeline.breakdown()[:top]:
+        print('{:>10.3f} ms  {:<10} {}'.format(
+            event.duration * 1000, event.category, event.name))
+    print('Startup: {:.3f} ms'.format(startup * 1000))
+    if output:
+        if output_format == 'trace':
+            data = timeline.as_trace()
+        else:
+            data = timeline.as_dict()
+        json.dump(data, output, indent=2)
+
+
 @cli.command()
 def runserver():
     loop = asyncio.get_event_loop()
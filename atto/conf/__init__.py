@@ -38,7 +38,7 @@ class Settings:
                     origin_value = _cast_env_value(origin_type, env_value)
                 self.__dict__[name] = origin_value
             else:
-                if not isinstance(value, origin_type):
+                if not _is_instance(value, origin_type):
                     error_msg = 'Mistmatch variable type {}{}. Expected: {}'\
                         .format(name, origin_type, type(value))
                     raise RuntimeError(error_msg)
@@ -70,11 +70,20 @@ def _is_valid_name(name):
     return name.startswith('_') or not name.isupper()
 
 
+def _is_instance(value, origin_type):
+    # float setting, e.g. timeout, may be given as int
+    if issubclass(origin_type, float):
+        return isinstance(value, (int, float)) and not isinstance(value, bool)
+    return isinstance(value, origin_type)
+
+
 def _cast_env_value(origin_type, value):
     if issubclass(origin_type, bool):
         return value.upper() in ('1', 'TRUE')
     elif issubclass(origin_type, int):
         return int(value)
+    elif issubclass(origin_type, float):
+        return float(value)
     elif issubclass(origin_type, Path):
         return Path(value)
     elif issubclass(origin_type, bytes):
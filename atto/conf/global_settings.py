@@ -13,3 +13,22 @@ REDIS_HOST = 'localhost'
 REDIS_PORT = 6379
 
 STATIC_URL = '/static/'
+
+SERVICE_PROPERTIES_SCHEMA = {}
+
+REGISTRY_METRICS = False
+METRICS_URL = '/_atto/metrics'
+
+REGISTRY_INDEX_MRO = False
+
+BUNDLE_STOP_TIMEOUT = 10.0
+FRAMEWORK_STOP_TIMEOUT = 30.0
+
+ACTIVATOR_EXECUTOR = False
+ACTIVATOR_EXECUTOR_WORKERS = 0
+
+# file caching which modules of installed packages are bundles
+BUNDLE_MANIFEST = ''
+
+# file storing resolved bundles and their metadata between starts
+BOOT_CACHE = ''
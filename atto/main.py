@@ -3,7 +3,7 @@ import logging
 from atto_api.web import IWebApplication
 
 from . import settings as atto_settings
-from .cdi import create_framework
+from .cdi import create_framework, span
 from .conf import Settings
 
 FORMAT = '[%(levelname)s] %(name)s (%(filename)s) %(message)s'
@@ -12,14 +12,17 @@ logging.basicConfig(format=FORMAT, level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
 
-async def create_app(loop, settings):
-    settings = Settings(settings)
-    settings.extend(atto_settings)
+async def create_app(loop, settings=None, timeline=None, requires=None):
+    with span(timeline, 'settings', 'app'):
+        settings = Settings(settings)
+        settings.extend(atto_settings)
 
-    cdi = create_framework(settings.INSTALLED_BUNDLES, settings)
+    cdi = create_framework(settings.INSTALLED_BUNDLES, settings, timeline)
 
-    await cdi.start()
-    app = _find_web_app(cdi)
+    await cdi.start(requires)
+    with span(timeline, 'web_app', 'app'):
+        app = _find_web_app(cdi)
+    app['atto.framework'] = cdi
     app.on_cleanup.append(lambda _: cdi.stop())
     return app
 
@@ -1 +1,3 @@
-from .parser import create_query
+from .batch import filter_indices, match_many
+from .compiler import compile_query
+from .parser import create_query, query_cache
@@ -0,0 +1,106 @@
+from . import nodes
+from .compiler import value_predicate
+from .parser import create_query
+from .schema import apply_schema
+
+
+def match_many(query, rows, schema=None):
+    rows = _as_list(rows)
+    result = [False] * len(rows)
+    for index in filter_indices(query, rows, schema):
+        result[index] = True
+    return result
+
+
+def filter_indices(query, rows, schema=None):
+    rows = _as_list(rows)
+    node = apply_schema(create_query(query), schema)
+    return _evaluate(node, _Columns(rows), range(len(rows)))
+
+
+def _as_list(rows):
+    if isinstance(rows, (list, tuple)):
+        return rows
+    return list(rows)
+
+
+class _Columns:
+    def __init__(self, rows):
+        self.rows = rows
+        self.__columns = {}
+
+    def get(self, name):
+        try:
+            return self.__columns[name]
+        except KeyError:
+            column = self.__columns[name] = [
+                row.get(name, _MISSING) for row in self.rows]
+            return column
+
+
+def _evaluate(node, columns, candidates):
+    evaluator = _EVALUATORS.get(type(node))
+    if evaluator is not None:
+        return evaluator(node, columns, candidates)
+    predicate = value_predicate(node)
+    if predicate is not None:
+        return _evaluate_column(columns.get(node.name), predicate, candidates)
+    # unknown (user defined) node - match row by row
+    rows = columns.rows
+    return [index for index in candidates if node.match(rows[index])]
+
+
+def _evaluate_column(column, predicate, candidates):
+    result = []
+    for index in candidates:
+        item = column[index]
+        if item is not _MISSING and predicate(item):
+            result.append(index)
+    return result
+
+
+def _evaluate_and(node, columns, candidates):
+    for item in node.value:
+        if not candidates:
+            break
+        candidates = _evaluate(item, columns, candidates)
+    return list(candidates)
+
+
+def _evaluate_or(node, columns, candidates):
+    matched = set()
+    remaining = candidates
+    for item in node.value:
+        if not remaining:
+            break
+        found = _evaluate(item, columns, remaining)
+        if found:
+            matched.update(found)
+            remaining = [index for index in remaining if index not in matched]
+    return [index for index in candidates if index in matched]
+
+
+def _evaluate_not(node, columns, candidates):
+    if len(node.value) == 1:
+        found = _evaluate(node.value[0], columns, candidates)
+    else:
+        found = _evaluate_and(node, columns, candidates)
+    found = set(found)
+    return [index for index in candidates if index not in found]
+
+
+def _evaluate_present(node, columns, candidates):
+    column = columns.get(node.name)
+    return [index for index in candidates if column[index] is not _MISSING]
+
+
+_MISSING = object()
+
+_EVALUATORS = {
+    nodes.AndNode: _evaluate_and,
+    nodes.OrNode: _evaluate_or,
+    nodes.NotNode: _evaluate_not,
+    nodes.PresentNode: _evaluate_present,
+    nodes.AllNode: lambda node, columns, candidates: list(candidates),
+    nodes.NoneNode: lambda node, columns, candidates: [],
+}
@@ -0,0 +1,69 @@
+import collections
+import threading
+
+CacheInfo = collections.namedtuple(
+    'CacheInfo', 'hits misses evictions maxsize currsize')
+
+
+class QueryCache:
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self.__lock = threading.Lock()
+        self.__items = collections.OrderedDict()
+        self.__hits = 0
+        self.__misses = 0
+        self.__evictions = 0
+
+    def get(self, key, factory):
+        with self.__lock:
+            try:
+                value = self.__items[key]
+            except KeyError:
+                self.__misses += 1
+            else:
+                self.__items.move_to_end(key)
+                self.__hits += 1
+                return value
+
+        # build outside of lock, parsing can be slow
+        value = factory()
+
+        with self.__lock:
+            if key in self.__items:
+                # created by other thread in meantime, keep shared one
+                self.__items.move_to_end(key)
+                return self.__items[key]
+            self.__items[key] = value
+            while len(self.__items) > self.maxsize:
+                self.__items.popitem(last=False)
+                self.__evictions += 1
+        return value
+
+    def clear(self):
+        with self.__lock:
+            self.__items.clear()
+            self.__hits = self.__misses = self.__evictions = 0
+
+    def info(self):
+        with self.__lock:
+            return CacheInfo(self.__hits, self.__misses, self.__evictions,
+                             self.maxsize, len(self.__items))
+
+    def __len__(self):
+        return len(self.__items)
+
+
+def query_key(query):
+    if isinstance(query, str):
+        return 'str', query.strip()
+    if isinstance(query, dict):
+        items = []
+        for name, value in query.items():
+            if isinstance(value, (list, tuple)):
+                value = tuple(value)
+            items.append((name, value))
+        try:
+            return 'dict', frozenset(items)
+        except TypeError:
+            return None
+    return None
@@ -0,0 +1,220 @@
+import weakref
+
+from . import nodes
+from .parser import create_query
+from .schema import apply_schema, schema_key, typed_predicate
+
+_compiled = weakref.WeakKeyDictionary()
+
+
+def compile_query(query, schema=None):
+    node = create_query(query)
+    if not node._frozen:
+        return _compile(apply_schema(node, schema))
+    key = schema_key(schema)
+    matchers = _compiled.setdefault(node, {})
+    try:
+        return matchers[key]
+    except KeyError:
+        matcher = matchers[key] = _compile(apply_schema(node, schema))
+        return matcher
+
+
+def value_predicate(node):
+    # check of a single attribute value shared by compiled matchers and
+    # the batch evaluator, None for nodes not testing one value
+    if node.value_type is not None:
+        return typed_predicate(node)
+    factory = _PREDICATES.get(type(node))
+    if factory is None:
+        return None
+    return factory(node)
+
+
+def _compile(node):
+    predicate = value_predicate(node)
+    if predicate is not None:
+        return _compile_leaf(node.name, predicate)
+    try:
+        compiler = _COMPILERS[type(node)]
+    except KeyError:
+        # unknown (user defined) node - fallback to tree walking
+        return node.match
+    return compiler(node)
+
+
+def _compile_leaf(name, predicate):
+    def match(params):
+        if name in params:
+            return predicate(params[name])
+        return False
+    return match
+
+
+def _compile_and(node):
+    matchers = tuple(_compile(item) for item in node.value)
+    if not matchers:
+        return _match_all
+    if len(matchers) == 1:
+        return matchers[0]
+    if len(matchers) == 2:
+        first, second = matchers
+
+        def match(params):
+            return first(params) and second(params)
+        return match
+
+    def match(params):
+        for matcher in matchers:
+            if not matcher(params):
+                return False
+        return True
+    return match
+
+
+def _compile_or(node):
+    matchers = tuple(_compile(item) for item in node.value)
+    if not matchers:
+        return _match_none
+    if len(matchers) == 1:
+        return matchers[0]
+    if len(matchers) == 2:
+        first, second = matchers
+
+        def match(params):
+            return first(params) or second(params)
+        return match
+
+    def match(params):
+        for matcher in matchers:
+            if matcher(params):
+                return True
+        return False
+    return match
+
+
+def _compile_not(node):
+    matchers = tuple(_compile(item) for item in node.value)
+    if not matchers:
+        return _match_none
+    if len(matchers) == 1:
+        matcher = matchers[0]
+
+        def match(params):
+            return not matcher(params)
+        return match
+
+    def match(params):
+        for matcher in matchers:
+            if not matcher(params):
+                return True
+        return False
+    return match
+
+
+def _compile_present(node):
+    name = node.name
+
+    def match(params):
+        return name in params
+    return match
+
+
+def _eq_predicate(node):
+    value = node.value
+
+    def predicate(item):
+        if isinstance(item, _SEQUENCES):
+            return value in item
+        return item == value
+    return predicate
+
+
+def _in_predicate(node):
+    values = node.value
+
+    def predicate(item):
+        try:
+            if isinstance(item, _SEQUENCES):
+                return not values.isdisjoint(item)
+            return item in values
+        except TypeError:
+            return nodes.contains_any(values, item)
+    return predicate
+
+
+def _lte_predicate(node):
+    value = node.value
+
+    def predicate(item):
+        try:
+            return item <= value
+        except TypeError:
+            return False
+    return predicate
+
+
+def _gte_predicate(node):
+    value = node.value
+
+    def predicate(item):
+        try:
+            return item >= value
+        except TypeError:
+            return False
+    return predicate
+
+
+def _approx_predicate(node):
+    value = node.value
+
+    def predicate(item):
+        if isinstance(item, _SEQUENCES):
+            for sub in item:
+                if isinstance(sub, str) and value in sub:
+                    return True
+            return False
+        return isinstance(item, str) and value in item
+    return predicate
+
+
+def _substring_predicate(node):
+    match = node.value.match
+
+    def predicate(item):
+        if isinstance(item, _SEQUENCES):
+            for sub in item:
+                if match(sub):
+                    return True
+            return False
+        return bool(match(item))
+    return predicate
+
+
+def _match_all(params):
+    return True
+
+
+def _match_none(params):
+    return False
+
+
+_SEQUENCES = (list, tuple)
+
+_COMPILERS = {
+    nodes.AndNode: _compile_and,
+    nodes.OrNode: _compile_or,
+    nodes.NotNode: _compile_not,
+    nodes.PresentNode: _compile_present,
+    nodes.AllNode: lambda node: _match_all,
+    nodes.NoneNode: lambda node: _match_none,
+}
+
+_PREDICATES = {
+    nodes.EqNode: _eq_predicate,
+    nodes.InNode: _in_predicate,
+    nodes.LteNode: _lte_predicate,
+    nodes.GteNode: _gte_predicate,
+    nodes.ApproxNode: _approx_predicate,
+    nodes.SubstringNode: _substring_predicate,
+}
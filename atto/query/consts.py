@@ -4,6 +4,7 @@ AND = 'and'
 OR = 'or'
 NOT = 'not'
 EQ = 'eq'
+IN = 'in'
 LTE = 'lte'
 GTE = 'gte'
 APPROX = 'approx'
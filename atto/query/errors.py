@@ -0,0 +1,10 @@
+class QueryError(TypeError):
+    def __init__(self, message, query=None, position=None):
+        self.message = message
+        self.query = query
+        self.position = position
+        if position is not None:
+            message = '{} at position {}'.format(message, position)
+        if query is not None:
+            message = '{}: "{}"'.format(message, query)
+        super().__init__(message)
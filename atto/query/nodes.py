@@ -1,17 +1,51 @@
 
 class Node:
+    _frozen = False
+    value_type = None
+
     def __init__(self, value=None, name=''):
         self.value = value
         self.name = name
 
+    def __setattr__(self, name, value):
+        if self._frozen:
+            raise AttributeError(
+                '"{}" object is readonly'.format(self.__class__.__name__))
+        super().__setattr__(name, value)
+
+    def __delattr__(self, name):
+        if self._frozen:
+            raise AttributeError(
+                '"{}" object is readonly'.format(self.__class__.__name__))
+        super().__delattr__(name)
+
+    def freeze(self):
+        self._frozen = True
+        return self
+
     def match(self, params):
         raise NotImplemented
 
+    def match_many(self, rows, schema=None):
+        from .batch import match_many
+        return match_many(self, rows, schema)
+
+    def filter_indices(self, rows, schema=None):
+        from .batch import filter_indices
+        return filter_indices(self, rows, schema)
+
 
 class LogicNode(Node):
     def __init__(self):
         super().__init__([])
 
+    def freeze(self):
+        if not self._frozen:
+            for item in self.value:
+                item.freeze()
+            self.value = tuple(self.value)
+        return super().freeze()
+
 
 class AndNode(LogicNode):
     def match(self, params):
@@ -48,19 +82,36 @@ class EqNode(Node):
         return False
 
 
-class LteNode(Node):
+class InNode(Node):
     def match(self, params):
         if self.name in params:
             item = params[self.name]
-            return item <= self.value
+            try:
+                if isinstance(item, (list, tuple)):
+                    return not self.value.isdisjoint(item)
+                return item in self.value
+            except TypeError:
+                return contains_any(self.value, item)
+        return False
+
+
+class LteNode(Node):
+    def match(self, params):
+        if self.name in params:
+            try:
+                return params[self.name] <= self.value
+            except TypeError:
+                return False
         return False
 
 
 class GteNode(Node):
     def match(self, params):
         if self.name in params:
-            item = params[self.name]
-            return item >= self.value
+            try:
+                return params[self.name] >= self.value
+            except TypeError:
+                return False
         return False
 
 
@@ -68,11 +119,12 @@ class ApproxNode(Node):
     def match(self, params):
         if self.name in params:
             item = params[self.name]
+            # like substring, only strings may match
             if isinstance(item, (list, tuple)):
                 for sub in item:
-                    if self.value in sub:
+                    if isinstance(sub, str) and self.value in sub:
                         return True
-            else:
+            elif isinstance(item, str):
                 return self.value in item
         return False
 
@@ -104,3 +156,17 @@ class AllNode(Node):
 class NoneNode(Node):
     def match(self, params):
         return False
+
+
+def contains_any(values, item):
+    # item or any of its items is equal to one of values, as OR of EqNode,
+    # for unhashable items which can not be looked up in values
+    items = item if isinstance(item, (list, tuple)) else (item, )
+    for sub in items:
+        try:
+            if sub in values:
+                return True
+        except TypeError:
+            if any(sub == value for value in values):
+                return True
+    return False
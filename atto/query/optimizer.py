@@ -0,0 +1,150 @@
+from . import nodes
+
+
+def optimize(node):
+    optimizer = _OPTIMIZERS.get(type(node))
+    if optimizer is None:
+        return node
+    return optimizer(node)
+
+
+def _optimize_and(node):
+    children = []
+    for item in _flatten(node, nodes.AndNode):
+        if isinstance(item, nodes.NoneNode):
+            return item
+        if not isinstance(item, nodes.AllNode):
+            children.append(item)
+    return _logic_node(nodes.AndNode, children, nodes.AllNode)
+
+
+def _optimize_or(node):
+    children = []
+    values = {}
+    for item in _flatten(node, nodes.OrNode):
+        if isinstance(item, nodes.AllNode):
+            return item
+        if isinstance(item, nodes.NoneNode):
+            continue
+        if _is_mergeable(item):
+            if item.name not in values:
+                values[item.name] = set()
+                # keep position of first clause for the attribute
+                children.append(item.name)
+            if isinstance(item, nodes.InNode):
+                values[item.name].update(item.value)
+            else:
+                values[item.name].add(item.value)
+        else:
+            children.append(item)
+
+    for pos, item in enumerate(children):
+        if isinstance(item, str):
+            children[pos] = _eq_node(item, values[item])
+    return _logic_node(nodes.OrNode, children, nodes.NoneNode)
+
+
+def _optimize_not(node):
+    if len(node.value) == 1:
+        item = optimize(node.value[0])
+    else:
+        # "!" with many filters matches when any of them fails
+        item = optimize(_new_logic(nodes.AndNode, node.value))
+
+    if isinstance(item, nodes.AllNode):
+        return nodes.NoneNode()
+    if isinstance(item, nodes.NoneNode):
+        return nodes.AllNode()
+    if isinstance(item, nodes.NotNode):
+        return item.value[0]
+    return _new_logic(nodes.NotNode, [item])
+
+
+def _flatten(node, node_class):
+    # nested nodes of the same class are walked without recursion, so
+    # chains like (&(&(&...))) are not limited by stack depth
+    stack = [iter(node.value)]
+    while stack:
+        for item in stack[-1]:
+            if type(item) is node_class:
+                stack.append(iter(item.value))
+                break
+            item = optimize(item)
+            if type(item) is node_class:
+                yield from item.value
+            else:
+                yield item
+        else:
+            stack.pop()
+
+
+def _logic_node(node_class, children, empty_class):
+    unique = {}
+    for item in children:
+        unique.setdefault(_key(item), item)
+    children = sorted(unique.values(), key=_cost)
+    if not children:
+        return empty_class()
+    if len(children) == 1:
+        return children[0]
+    return _new_logic(node_class, children)
+
+
+def _new_logic(node_class, children):
+    node = node_class()
+    node.value.extend(children)
+    return node
+
+
+def _is_mergeable(node):
+    if type(node) not in (nodes.EqNode, nodes.InNode):
+        return False
+    try:
+        hash(node.value)
+    except TypeError:
+        return False
+    return True
+
+
+def _eq_node(name, values):
+    if len(values) == 1:
+        return nodes.EqNode(values.pop(), name)
+    return nodes.InNode(frozenset(values), name)
+
+
+def _key(node):
+    if isinstance(node, nodes.LogicNode):
+        return type(node), tuple(_key(item) for item in node.value)
+    key = type(node), node.name, node.value
+    try:
+        hash(key)
+    except TypeError:
+        return id(node)
+    return key
+
+
+def _cost(node):
+    if isinstance(node, nodes.LogicNode):
+        return sum(_cost(item) for item in node.value) + 1
+    return _COSTS.get(type(node), _DEFAULT_COST)
+
+
+_DEFAULT_COST = 10
+
+_COSTS = {
+    nodes.AllNode: 0,
+    nodes.NoneNode: 0,
+    nodes.PresentNode: 1,
+    nodes.EqNode: 2,
+    nodes.InNode: 2,
+    nodes.LteNode: 3,
+    nodes.GteNode: 3,
+    nodes.ApproxNode: 4,
+    nodes.SubstringNode: 8,
+}
+
+_OPTIMIZERS = {
+    nodes.AndNode: _optimize_and,
+    nodes.OrNode: _optimize_or,
+    nodes.NotNode: _optimize_not,
+}
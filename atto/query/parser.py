@@ -1,30 +1,43 @@
-import re
-
 from . import nodes
+from .cache import QueryCache, query_key
+from .errors import QueryError
+from .optimizer import optimize
+from .substring import SubstringPattern
+
+query_cache = QueryCache()
+
+_MATCH_ALL = nodes.AllNode().freeze()
 
 
 def create_query(query):
     if query is None:
-        return nodes.AllNode()
+        return _MATCH_ALL
 
     if isinstance(query, nodes.Node):
         return query
-    if isinstance(query, dict):
-        return _build_query(query)
+    if not isinstance(query, (dict, str)):
+        raise TypeError('Unknown filter type: "{}"'.format(type(query)))
+
+    key = query_key(query)
+    if key is None:
+        return _create_query(query).freeze()
+    return query_cache.get(key, lambda: _create_query(query).freeze())
 
-    if isinstance(query, str):
-        return _parse_query(query)
-    raise TypeError('Unknown filter type: "{}"'.format(type(query)))
+
+def _create_query(query):
+    if isinstance(query, dict):
+        return optimize(_build_query(query))
+    return optimize(_parse_query(query))
 
 
 def _build_query(rules):
     node = nodes.AndNode()
     for name, value in rules.items():
         if isinstance(value, (list, tuple)):
-            sub = nodes.OrFilter()
+            sub = nodes.OrNode()
             for v in value:
                 sub.value.append(nodes.EqNode(v, name))
-            if sub.value:
+            if len(sub.value) == 1:
                 node.value.append(sub.value[0])
             else:
                 node.value.append(sub)
@@ -36,109 +49,193 @@ def _build_query(rules):
 
 
 def _parse_query(query):
-    query = query.trim()
-    size = len(query)
-    stack = []
-    pos = 0
-    is_escaped = False
-    while pos < size:
-        if is_escaped:
-            is_escaped = False
+    return _Parser(query).parse()
+
+
+class _Parser:
+    def __init__(self, query):
+        self.query = query
+        self.size = len(query)
+
+    def error(self, message, position):
+        return QueryError(message, self.query, position)
+
+    def skip_spaces(self, pos):
+        query = self.query
+        while pos < self.size and query[pos] in _SPACES:
+            pos += 1
+        return pos
+
+    def parse(self):
+        query = self.query
+        size = self.size
+        pos = self.skip_spaces(0)
+        if pos == size:
+            raise self.error('Empty query', pos)
+        if query[pos] != '(':
+            # single item without parentheses, e.g. "name=redis"
+            node, pos = self.parse_item(pos)
+            if pos != size:
+                raise self.error('Unexpected ")"', pos)
+            return node
+
+        stack = []
+        while True:
+            pos = self.skip_spaces(pos)
+            if pos == size:
+                raise self.error('Not closed "("', stack[-1][1])
+            char = query[pos]
+            if char == '(':
+                start = pos
+                pos = self.skip_spaces(pos + 1)
+                if pos < size and query[pos] in _LOGIC_NODES:
+                    node_class = _LOGIC_NODES[query[pos]]
+                    # same nested nodes are flattened by optimizer, others
+                    # are walked recursively, so their depth is limited
+                    depth = 1
+                    if stack:
+                        parent, _, depth = stack[-1]
+                        if type(parent) is not node_class or \
+                                node_class is nodes.NotNode:
+                            depth += 1
+                    if depth > MAX_NESTING:
+                        raise self.error('Too deeply nested filter', start)
+                    stack.append((node_class(), start, depth))
+                    pos += 1
+                    continue
+                node, pos = self.parse_item(pos)
+                if pos == size:
+                    raise self.error('Not closed "("', start)
+                pos += 1
+            elif char == ')':
+                if not stack:
+                    raise self.error('Unexpected ")"', pos)
+                node, start, _ = stack.pop()
+                if isinstance(node, nodes.NotNode) and not node.value:
+                    raise self.error('Expected filter in "!"', start)
+                pos += 1
+            else:
+                raise self.error('Expected "("', pos)
+
+            if not stack:
+                pos = self.skip_spaces(pos)
+                if pos != size:
+                    raise self.error('Unexpected data after filter', pos)
+                return node
+
+            parent, start, _ = stack[-1]
+            if isinstance(parent, nodes.NotNode) and parent.value:
+                raise self.error('Expected only one filter in "!"', start)
+            parent.value.append(node)
+
+    def parse_item(self, pos):
+        query = self.query
+        size = self.size
+        start = pos
+        while pos < size and query[pos] not in _NAME_END:
             pos += 1
-            continue
+        name = query[start:pos].strip()
+
+        if pos == size or query[pos] == ')':
+            if not name:
+                raise self.error('Empty query', start)
+            if name == '*':
+                return nodes.AllNode(), pos
+            return nodes.PresentNode('*', name), pos
+        if not name:
+            raise self.error('Not found query name', start)
+
         char = query[pos]
         if char == '(':
-            next_char = query[pos + 1]
-            if next_char == '&':
-                stack.append(nodes.AndNode())
-            elif next_char == '|':
-                stack.append(nodes.OrNode())
-            elif next_char == '!':
-                stack.append(nodes.NotNode())
-            else:
-                stack.append(pos + 1)
-        elif char == ')':
-            top = stack.pop() if stack else None
-            head = stack[-1]
-            if isinstance(top, nodes.Node):
-                if isinstance(head, nodes.Node):
-                    head.value.append(top)
-                else:
-                    sf = top
-
-            elif isinstance(head, nodes.Node):
-                head.value.append(subquery(query, top, pos - 1))
+            raise self.error('Unexpected "("', pos)
+        if char == '=':
+            node_class = nodes.EqNode
+            pos += 1
+        else:
+            if pos + 1 == size or query[pos + 1] != '=':
+                raise self.error('Expected "=" after "{}"'.format(char), pos)
+            node_class = _COMPARE_NODES[char]
+            pos += 2
+
+        parts, pos = self.parse_value(pos)
+        if node_class is not nodes.EqNode:
+            return node_class('*'.join(parts), name), pos
+        if len(parts) == 1:
+            return nodes.EqNode(parts[0], name), pos
+        if len(parts) == 2 and not parts[0] and not parts[1]:
+            return nodes.PresentNode('*', name), pos
+        return nodes.SubstringNode(SubstringPattern(parts), name), pos
+
+    def parse_value(self, pos):
+        query = self.query
+        size = self.size
+        parts = []
+        chunks = []
+        while pos < size:
+            char = query[pos]
+            if char == ')':
+                break
+            elif char == '(':
+                raise self.error('Not escaped "("', pos)
+            elif char == '*':
+                parts.append(''.join(chunks))
+                chunks = []
+            elif char == '\\':
+                char, pos = self.parse_escape(pos)
+                chunks.append(char)
+                continue
             else:
-                sf = subquery(query, top, pos - 1)
-        elif not is_escaped and char == '\\':
-            is_escaped = True
-        pos += 1
-    if sf:
-        return sf
-    raise TypeError('Incorect query: "{}"'.format(query))
-
-
-def subquery(query, start, end):
-    sub = query[start, end + 1]
-
-    def check_equal(pos):
-        if query[pos] != '=':
-            raise TypeError('Expected <= in query: "{}"'.format(sub))
-
-    if sub == '*':
-        return nodes.AllNode()
-
-    if not sub:
-        raise TypeError('Empty query')
-
-    for c in list('~$^<>=*'):
-        if c in query:
-            break
-    else:
-        return nodes.PresentNode('*', sub)
-
-    end_name = start
-    while end_name < end:
-        if query[end_name] in '=<>~':
-            break
-        end_name += 1
-
-    if start == end_name:
-        raise TypeError('Not found query name: "{}"'.format(sub))
-
-    name = query[start, end_name]
-    start = end_name
-    char = query[start]
-    is_equal = False
-    if char == '=':
-        is_equal = True
-        Node = nodes.EqNode
-        start += 1
-    elif char == '<':
-        check_equal(start + 1)
-        Node = nodes.LteNode
-        start += 2
-    elif char == '>':
-        check_equal(start + 1)
-        Node = nodes.GteNode
-        start += 2
-    elif char == '~':
-        check_equal(start + 1)
-        Node = nodes.ApproxNode
-        start += 2
-    else:
-        raise TypeError('Unknowm query operator: "{}"'.format(sub))
-
-    if start > end:
-        raise TypeError('Not found query value')
-
-    value = query[start, end + 1]
-    if is_equal:
-        if value == '*':
-            Node = nodes.PresentNode
-        elif '*' in value:
-            Node = nodes.SubstringNode
-            value = '.*?'.join(value.split('*'))
-            value = re.compile('^' + value + '$', re.I)
-
-    return Node(value, name)
+                # copy whole run of plain characters at once
+                end = pos + 1
+                while end < size and query[end] not in _VALUE_SPECIAL:
+                    end += 1
+                chunks.append(query[pos:end])
+                pos = end
+                continue
+            pos += 1
+        parts.append(''.join(chunks))
+        return parts, pos
+
+    def parse_escape(self, pos):
+        query = self.query
+        data = bytearray()
+        start = pos
+        while pos + 2 < self.size and query[pos] == '\\':
+            code = query[pos + 1:pos + 3]
+            if not _is_hex(code):
+                break
+            data.append(int(code, 16))
+            pos += 3
+        if data:
+            try:
+                return data.decode('utf-8'), pos
+            except UnicodeDecodeError:
+                raise self.error('Invalid escaped value', start)
+        if pos + 1 >= self.size:
+            raise self.error('Not completed escape sequence', pos)
+        # not RFC 4515 escape "\\X" - take next character literally
+        return query[pos + 1], pos + 2
+
+
+def _is_hex(code):
+    return len(code) == 2 and all(c in _HEX for c in code)
+
+
+MAX_NESTING = 100
+
+_SPACES = ' \t\r\n'
+_HEX = '0123456789abcdefABCDEF'
+_NAME_END = '=<>~()'
+_VALUE_SPECIAL = '()*\\'
+
+_LOGIC_NODES = {
+    '&': nodes.AndNode,
+    '|': nodes.OrNode,
+    '!': nodes.NotNode,
+}
+
+_COMPARE_NODES = {
+    '<': nodes.LteNode,
+    '>': nodes.GteNode,
+    '~': nodes.ApproxNode,
+}
@@ -0,0 +1,110 @@
+import operator
+
+from . import nodes
+from .errors import QueryError
+
+
+def apply_schema(node, schema):
+    if not schema:
+        return node
+    if isinstance(node, nodes.LogicNode):
+        typed = type(node)()
+        typed.value.extend(apply_schema(item, schema) for item in node.value)
+        return typed
+    if type(node) not in _COMPARATORS or node.name not in schema:
+        return node
+
+    value_type = schema[node.name]
+    if isinstance(node, nodes.InNode):
+        value = frozenset(
+            _coerce_value(value_type, item, node) for item in node.value)
+    else:
+        value = _coerce_value(value_type, node.value, node)
+    typed = type(node)(value, node.name)
+    typed.value_type = value_type
+    return typed
+
+
+class Schema(dict):
+    # schema with its matchers cache key computed once, it is readonly so
+    # the key can not get stale
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.key = frozenset(self.items()) if self else None
+
+    def __readonly(self, *args, **kwargs):
+        raise TypeError(
+            '"{}" object is readonly'.format(self.__class__.__name__))
+
+    __setitem__ = __delitem__ = __ior__ = __readonly
+    update = setdefault = pop = popitem = clear = __readonly
+
+    def __reduce__(self):
+        return self.__class__, (dict(self), )
+
+
+def schema_key(schema):
+    if not schema:
+        return None
+    if isinstance(schema, Schema):
+        return schema.key
+    return frozenset(schema.items())
+
+
+def typed_predicate(node):
+    compare = _COMPARATORS[type(node)]
+    value_type = node.value_type
+    value = node.value
+
+    def check(item):
+        if item.__class__ is not value_type:
+            try:
+                item = coerce(value_type, item)
+            except (TypeError, ValueError):
+                return False
+        return compare(item, value)
+
+    def predicate(item):
+        if isinstance(item, (list, tuple)):
+            for sub in item:
+                if check(sub):
+                    return True
+            return False
+        return check(item)
+    return predicate
+
+
+def coerce(value_type, value):
+    if isinstance(value, value_type):
+        return value
+    if issubclass(value_type, bool) and isinstance(value, str):
+        value = value.strip().lower()
+        if value in ('1', 'true'):
+            return True
+        if value in ('0', 'false'):
+            return False
+        raise ValueError('Not boolean value: "{}"'.format(value))
+    return value_type(value)
+
+
+def _coerce_value(value_type, value, node):
+    try:
+        return coerce(value_type, value)
+    except (TypeError, ValueError):
+        raise QueryError('Invalid value "{}" of "{}", expected {}'.format(
+            value, node.name, value_type.__name__))
+
+
+def _contains(item, values):
+    try:
+        return item in values
+    except TypeError:
+        return nodes.contains_any(values, item)
+
+
+_COMPARATORS = {
+    nodes.EqNode: operator.eq,
+    nodes.InNode: _contains,
+    nodes.LteNode: operator.le,
+    nodes.GteNode: operator.ge,
+}
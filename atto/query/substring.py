@@ -0,0 +1,88 @@
+import re
+
+
+class SubstringPattern:
+    def __init__(self, parts):
+        self.parts = tuple(part.casefold() for part in parts)
+        self.match = _create_matcher(self.parts)
+
+    @property
+    def regex(self):
+        pattern = '.*?'.join(re.escape(part) for part in self.parts)
+        return re.compile('^' + pattern + '$', re.I | re.S)
+
+    def __eq__(self, other):
+        if not isinstance(other, SubstringPattern):
+            return NotImplemented
+        return self.parts == other.parts
+
+    def __hash__(self):
+        return hash(self.parts)
+
+    def __repr__(self):
+        return 'SubstringPattern({!r})'.format('*'.join(self.parts))
+
+
+def _create_matcher(parts):
+    initial = parts[0]
+    final = parts[-1]
+    middle = tuple(part for part in parts[1:-1] if part)
+
+    if not middle and not final:
+        if not initial:
+            # "*" or "**"
+            return _match_any
+
+        def match(value):
+            return isinstance(value, str) and \
+                value.casefold().startswith(initial)
+        return match
+
+    if not middle and not initial:
+        def match(value):
+            return isinstance(value, str) and \
+                value.casefold().endswith(final)
+        return match
+
+    if not middle:
+        min_size = len(initial) + len(final)
+
+        def match(value):
+            if not isinstance(value, str):
+                return False
+            value = value.casefold()
+            return len(value) >= min_size and value.startswith(initial) \
+                and value.endswith(final)
+        return match
+
+    if not initial and not final and len(middle) == 1:
+        needle = middle[0]
+
+        def match(value):
+            return isinstance(value, str) and needle in value.casefold()
+        return match
+
+    # segments are found in order, each after the previous one, middle
+    # segments must end before final one starts
+    min_size = len(initial) + sum(len(part) for part in middle) + len(final)
+
+    def match(value):
+        if not isinstance(value, str):
+            return False
+        value = value.casefold()
+        if len(value) < min_size or not value.startswith(initial) or \
+                not value.endswith(final):
+            return False
+        offset = len(initial)
+        end = len(value) - len(final)
+        for part in middle:
+            offset = value.find(part, offset, end)
+            if offset < 0:
+                return False
+            offset += len(part)
+        return True
+    return match
+
+
+def _match_any(value):
+    return isinstance(value, str)
@@ -1,28 +1,42 @@
+import asyncio
+
 import aioredis
 
 from atto_api.cdi import activator
 from atto_api.services import ICache, ISessionStore
 
+from ..cdi import SCOPE_SINGLETON, ServiceFactory
+
 
 class RedisCache:
     def __init__(self, host, port):
         self._host = host
         self._port = port
+        self.redis = None
+        self._lock = asyncio.Lock()
 
     async def connect(self):
-        self.redis = await aioredis.create_pool((
-            self._host, self._port
-        ))
+        # pool is opened on first use
+        async with self._lock:
+            if self.redis is None:
+                self.redis = await aioredis.create_pool((
+                    self._host, self._port
+                ))
+        return self.redis
 
     async def close(self):
-        self.redis.close()
-        await self.redis.wait_closed()
+        if self.redis is not None:
+            self.redis.close()
+            await self.redis.wait_closed()
+            self.redis = None
 
     async def set(self, name, value):
-        await self.redis.set(name, value)
+        redis = self.redis or await self.connect()
+        await redis.set(name, value)
 
     async def get(self, name):
-        return await self.redis.get(name)
+        redis = self.redis or await self.connect()
+        return await redis.get(name)
 
     async def load(self, key):
         return await self.get(key)
@@ -31,17 +45,31 @@ class RedisCache:
         await self.set(key, value)
 
 
+class RedisCacheFactory(ServiceFactory):
+    def __init__(self, host, port):
+        self._host = host
+        self._port = port
+        self.service = None
+
+    def get_service(self, bundle, registration):
+        self.service = RedisCache(self._host, self._port)
+        return self.service
+
+
 @activator
 class CacheActivator:
+    requires = ()
+    provides = (ICache, ISessionStore)
+
     async def start(self, ctx):
         props = ctx.get_property('REDIS')
-        self.service = RedisCache(props['host'], props['port'])
-        await self.service.connect()
+        self.factory = RedisCacheFactory(props['host'], props['port'])
         classes = (ICache, ISessionStore)
-        self.reg = ctx.register_service(classes, self.service, {
+        self.reg = ctx.register_factory(classes, self.factory, {
             'name': 'redis'
-        })
+        }, scope=SCOPE_SINGLETON)
 
     async def stop(self, ctx):
         self.reg.unregister()
-        await self.service.close()
+        if self.factory.service is not None:
+            await self.factory.service.close()
@@ -2,6 +2,8 @@
 from atto_api.cdi import activator
 from atto_api.source import ISourceType, ISourceTypeGroups
 
+from ..cdi import SCOPE_SINGLETON
+
 
 class PostgreSqlSource:
     pass
@@ -13,20 +15,23 @@ class MySqlSource:
 
 @activator
 class Databases:
+    requires = ()
+    provides = (ISourceType, )
+
     def start(self, ctx):
-        ctx.register_service(ISourceType, PostgreSqlSource(), {
+        ctx.register_factory(ISourceType, PostgreSqlSource, {
             'group': ISourceTypeGroups.DATABASE,
             'name': 'psql',
             'label': 'PostgreSQL',
             'descripions': 'Database source supporting PostgreSQL connections'
-        })
+        }, scope=SCOPE_SINGLETON)
 
-        ctx.register_service(ISourceType, MySqlSource(), {
+        ctx.register_factory(ISourceType, MySqlSource, {
             'group': ISourceTypeGroups.DATABASE,
             'name': 'mysql',
             'label': 'MySQL',
             'descripions': 'Database source supporting MySQL connections'
-        })
+        }, scope=SCOPE_SINGLETON)
 
     def stop(self, ctx):
         pass
@@ -4,6 +4,8 @@ from aiohttp import web
 from atto_api.cdi import activator
 from atto_api.web import IWebApplication
 
+from ..cdi import RegistryMetrics
+
 
 class Sources:
     def get(self, request):
@@ -27,10 +29,23 @@ def aiohttp_middleware(cdi):
     return atto_middleware
 
 
+def metrics_handler(registry_metrics):
+    async def metrics(request):
+        return web.json_response(registry_metrics.as_dict())
+    return metrics
+
+
 @activator
 class WebHandlers:
+    requires = ()
+    provides = (IWebApplication, )
+
     def start(self, ctx):
         app = web.Application(middlewares=[])
+        ref = ctx.get_service_reference(RegistryMetrics)
+        if ref:
+            app.router.add_route('GET', ctx.get_property('METRICS_URL'),
+                                 metrics_handler(ctx.get_service(ref)))
         ctx.register_service(IWebApplication, app)
 
     def stop(self, ctx):
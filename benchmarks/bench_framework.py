@@ -0,0 +1,49 @@
+import asyncio
+import sys
+import types
+
+from atto_api.cdi.consts import ACTIVATOR
+
+from atto.cdi import create_framework
+
+
+class Activator:
+    def __init__(self, name):
+        self.name = name
+
+    async def start(self, ctx):
+        self.registration = ctx.register_service(
+            'benchmarks.IService', object(), {'name': self.name})
+
+    async def stop(self, ctx):
+        self.registration.unregister()
+
+
+def create_bundles(size):
+    names = []
+    for index in range(size):
+        name = 'benchmarks._bundles.bundle{}'.format(index)
+        module = types.ModuleType(name)
+        setattr(module, ACTIVATOR, Activator(name))
+        sys.modules[name] = module
+        names.append(name)
+    return names
+
+
+def start_stop(names):
+    loop = asyncio.new_event_loop()
+    try:
+        framework = create_framework(names, {})
+        loop.run_until_complete(framework.start())
+        loop.run_until_complete(framework.stop())
+    finally:
+        loop.close()
+
+
+def benchmarks(sizes):
+    for size in sizes:
+        if size > 1000:
+            continue
+        names = create_bundles(size)
+        yield 'framework.start_stop[{}]'.format(size), \
+            lambda names=names: start_stop(names), 1
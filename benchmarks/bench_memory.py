@@ -0,0 +1,41 @@
+import gc
+import tracemalloc
+
+from atto.cdi.framework import Framework
+
+from .bench_registry import IService
+
+
+def registry_memory(size):
+    gc.collect()
+    tracemalloc.start()
+    try:
+        framework = Framework({})
+        start = tracemalloc.get_traced_memory()[0]
+        registrations = [
+            framework.register_service(framework, IService, object(), {
+                'name': 'service{}'.format(index),
+                'group': ('db', 'cache', 'web')[index % 3],
+            })
+            for index in range(size)
+        ]
+        used = tracemalloc.get_traced_memory()[0] - start
+    finally:
+        tracemalloc.stop()
+    del registrations
+    return used
+
+
+def memory(sizes):
+    for size in sizes:
+        used = registry_memory(size)
+        yield 'memory.registry[{}]'.format(size), {
+            'bytes': used,
+            'per_service': used / size,
+        }
+
+
+if __name__ == '__main__':
+    for name, result in memory((100000, )):
+        print('{:<40} {:>12} bytes {:>8.1f} per service'.format(
+            name, result['bytes'], result['per_service']))
@@ -0,0 +1,59 @@
+from atto.query import (compile_query, create_query, filter_indices,
+                        query_cache)
+from atto.query.parser import _parse_query
+
+SIMPLE = '(&(objectClass=atto.services.ICache)(name=redis))'
+NESTED = ('(&(|(group=db)(group=cache))(!(disabled=*))'
+          '(service.ranking>=0)(name=*sql*))')
+
+
+def large_filter(size):
+    return '(|{})'.format(
+        ''.join('(name=service{})'.format(i) for i in range(size)))
+
+
+def properties(size):
+    return [{
+        'objectClass': ('atto.services.ICache', ),
+        'service.id': index,
+        'service.ranking': index % 10,
+        'name': 'service{}'.format(index),
+        'group': ('db', 'cache', 'web')[index % 3],
+    } for index in range(size)]
+
+
+def benchmarks(sizes):
+    yield 'query.parse.simple', lambda: _parse_query(SIMPLE), 1000
+    yield 'query.parse.nested', lambda: _parse_query(NESTED), 1000
+    yield 'query.create.cached', lambda: create_query(NESTED), 10000
+    for size in sizes:
+        if size > 10000:
+            continue
+        text = large_filter(size)
+        yield 'query.parse.or[{}]'.format(size), \
+            lambda text=text: _parse_query(text), 1
+
+        def create(text=text):
+            query_cache.clear()
+            create_query(text)
+
+        yield 'query.create.or[{}]'.format(size), create, 1
+
+    for size in sizes:
+        rows = properties(size)
+        matcher = compile_query(NESTED, {'service.ranking': int})
+        tree = create_query(NESTED)
+
+        def match_tree(tree=tree, rows=rows):
+            for row in rows:
+                tree.match(row)
+
+        def match_compiled(matcher=matcher, rows=rows):
+            for row in rows:
+                matcher(row)
+
+        number = max(1, 10000 // size)
+        yield 'query.match.tree[{}]'.format(size), match_tree, number
+        yield 'query.match.compiled[{}]'.format(size), match_compiled, number
+        yield 'query.match.batch[{}]'.format(size), \
+            lambda rows=rows: filter_indices(NESTED, rows), number
@@ -0,0 +1,118 @@
+from atto.cdi.framework import Framework
+
+
+class IService:
+    pass
+
+
+class IOther:
+    pass
+
+
+def register(framework, size):
+    return [
+        framework.register_service(framework, IService, object(), {
+            'name': 'service{}'.format(index),
+            'group': ('db', 'cache', 'web')[index % 3],
+            'service.ranking': index % 10,
+        })
+        for index in range(size)
+    ]
+
+
+def register_many(framework, size):
+    return framework.register_many(framework, [
+        (IService, object(), {
+            'name': 'service{}'.format(index),
+            'group': ('db', 'cache', 'web')[index % 3],
+            'service.ranking': index % 10,
+        })
+        for index in range(size)
+    ])
+
+
+def benchmarks(sizes):
+    for size in sizes:
+        number = max(1, 1000 // size)
+
+        yield 'registry.register[{}]'.format(size), \
+            lambda size=size: register(Framework({}), size), number
+
+        yield 'registry.register_many[{}]'.format(size), \
+            lambda size=size: register_many(Framework({}), size), number
+
+        def unregister(size=size):
+            for registration in register(Framework({}), size):
+                registration.unregister()
+
+        yield 'registry.register_unregister[{}]'.format(size), \
+            unregister, number
+
+        framework = Framework({})
+        registrations = register(framework, size)
+        register(framework, 10)
+        reference = registrations[-1].get_reference()
+        name = reference.get_property('name')
+        other = framework.register_service(framework, IOther, object())
+
+        def invalidate(other=other):
+            # new registry generation drops cached lookups, cost of this
+            # alone is measured by registry.set_properties
+            other.set_properties({})
+
+        def find_class(framework=framework):
+            for _ in range(100):
+                framework.get_service_reference(IService)
+
+        def find_eq(framework=framework, filter='(name={})'.format(name)):
+            for _ in range(100):
+                framework.get_service_reference(IService, filter)
+
+        def find_scan(framework=framework):
+            for _ in range(100):
+                framework.get_service_reference(IService, '(name=*9)')
+
+        def find_all(framework=framework):
+            framework.get_service_references(None, '(group=db)')
+
+        def find_class_miss(framework=framework):
+            for _ in range(100):
+                invalidate()
+                framework.get_service_reference(IService)
+
+        def find_eq_miss(framework=framework,
+                         filter='(name={})'.format(name)):
+            for _ in range(100):
+                invalidate()
+                framework.get_service_reference(IService, filter)
+
+        def find_scan_miss(framework=framework):
+            for _ in range(10):
+                invalidate()
+                framework.get_service_reference(IService, '(name=*9)')
+
+        def find_all_miss(framework=framework):
+            invalidate()
+            framework.get_service_references(None, '(group=db)')
+
+        def set_properties():
+            for _ in range(100):
+                invalidate()
+
+        def get_service(framework=framework, reference=reference):
+            for _ in range(100):
+                framework.get_service(framework, reference)
+
+        yield 'registry.find.class[{}]'.format(size), find_class, 10
+        yield 'registry.find.eq[{}]'.format(size), find_eq, 10
+        yield 'registry.find.substring[{}]'.format(size), find_scan, 1
+        yield 'registry.find.all[{}]'.format(size), find_all, 1
+        # lookups above repeat and are served from lookup cache after the
+        # first run, these compute every lookup
+        yield 'registry.find.class.miss[{}]'.format(size), find_class_miss, 10
+        yield 'registry.find.eq.miss[{}]'.format(size), find_eq_miss, 10
+        yield 'registry.find.substring.miss[{}]'.format(size), \
+            find_scan_miss, 1
+        yield 'registry.find.all.miss[{}]'.format(size), find_all_miss, 1
+        yield 'registry.set_properties[{}]'.format(size), set_properties, 10
+        yield 'registry.get_service[{}]'.format(size), get_service, 10
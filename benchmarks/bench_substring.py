@@ -0,0 +1,42 @@
+import timeit
+
+from atto.query.substring import SubstringPattern
+
+PATTERNS = ['service*', '*.redis', '*cache*', 'atto*web*handler']
+
+VALUES = [
+    'service.cache.redis',
+    'atto.services.web.handler',
+    'atto.services.sql.PostgreSqlSource',
+    'Service.Cache.Redis',
+] * 25
+
+
+def compare(pattern):
+    substring = SubstringPattern(pattern.split('*'))
+
+    def check_substring(match=substring.match):
+        for value in VALUES:
+            match(value)
+
+    def check_regex(match=substring.regex.match):
+        for value in VALUES:
+            match(value)
+
+    return check_substring, check_regex
+
+
+def benchmarks(sizes):
+    for pattern in PATTERNS:
+        check_substring, check_regex = compare(pattern)
+        yield 'substring.pattern[{}]'.format(pattern), check_substring, 1000
+        yield 'substring.regex[{}]'.format(pattern), check_regex, 1000
+
+
+if __name__ == '__main__':
+    for pattern in PATTERNS:
+        substring, regex = (
+            min(timeit.repeat(check, number=1000, repeat=3))
+            for check in compare(pattern))
+        print('{:<20} substring: {:.4f}s  regex: {:.4f}s  x{:.2f}'.format(
+            pattern, substring, regex, regex / substring))
@@ -0,0 +1,38 @@
+import argparse
+import json
+import sys
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        description='Compare two benchmark result files')
+    parser.add_argument('base')
+    parser.add_argument('current')
+    parser.add_argument('-t', '--threshold', type=float, default=1.2,
+                        help='ratio reported as regression (default: 1.2)')
+    options = parser.parse_args(args)
+
+    with open(options.base) as fp:
+        base = json.load(fp)
+    with open(options.current) as fp:
+        current = json.load(fp)
+
+    regressions = 0
+    for name, result in sorted(current['results'].items()):
+        # timing results keep "min" seconds, memory ones "bytes"
+        field = 'min' if 'min' in result else 'bytes'
+        if name not in base['results']:
+            print('{:<50} {:>14.6g} (new)'.format(name, result[field]))
+            continue
+        ratio = result[field] / base['results'][name][field]
+        mark = ''
+        if ratio >= options.threshold:
+            mark = ' REGRESSION'
+            regressions += 1
+        print('{:<50} {:>14.6g} x{:.2f}{}'.format(
+            name, result[field], ratio, mark))
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,91 @@
+import argparse
+import importlib
+import json
+import logging
+import platform
+import subprocess
+import time
+import timeit
+
+MODULES = [
+    'benchmarks.bench_query',
+    'benchmarks.bench_substring',
+    'benchmarks.bench_registry',
+    'benchmarks.bench_framework',
+    'benchmarks.bench_memory',
+]
+
+SIZES = (10, 1000, 100000)
+QUICK_SIZES = (10, 1000)
+
+
+def measure(func, number=1, repeat=3):
+    times = [
+        value / number
+        for value in timeit.repeat(func, number=number, repeat=repeat)
+    ]
+    return {
+        'min': min(times),
+        'mean': sum(times) / len(times),
+        'number': number,
+        'repeat': repeat,
+    }
+
+
+def run(sizes, selected=None, verbose=True):
+    results = {}
+    for module_name in MODULES:
+        module = importlib.import_module(module_name)
+        for name, func, number in getattr(module, 'benchmarks', _empty)(sizes):
+            if selected and not any(part in name for part in selected):
+                continue
+            result = results[name] = measure(func, number)
+            if verbose:
+                print('{:<50} {:>12.6f}s'.format(name, result['min']))
+        for name, result in getattr(module, 'memory', _empty)(sizes):
+            if selected and not any(part in name for part in selected):
+                continue
+            results[name] = result
+            if verbose:
+                print('{:<50} {:>12} bytes'.format(name, result['bytes']))
+    return results
+
+
+def _empty(sizes):
+    return ()
+
+
+def _commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='Run atto benchmarks')
+    parser.add_argument('names', nargs='*',
+                        help='run only benchmarks containing given names')
+    parser.add_argument('-o', '--output', help='save results as JSON')
+    parser.add_argument('-q', '--quick', action='store_true',
+                        help='skip the largest sizes')
+    options = parser.parse_args(args)
+    logging.disable(logging.CRITICAL)
+
+    sizes = QUICK_SIZES if options.quick else SIZES
+    results = run(sizes, options.names)
+    if options.output:
+        with open(options.output, 'w') as fp:
+            json.dump({
+                'commit': _commit(),
+                'python': platform.python_version(),
+                'created': time.time(),
+                'sizes': sizes,
+                'results': results,
+            }, fp, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+import asyncio
+import importlib.util
+import json
+import os
+import sys
+import types
+
+import pytest
+
+from atto.cdi import create_framework
+from atto.cdi.bootcache import BootCache
+
+BUNDLE = '''
+from atto_api.cdi import activator
+
+
+@activator
+class Activator:
+    requires = ()
+    provides = ('cached.IService', )
+
+    def start(self, ctx):
+        ctx.register_service('cached.IService', object())
+'''
+
+
+def run(coro):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+@pytest.fixture
+def bundle_file(tmp_path, monkeypatch):
+    monkeypatch.syspath_prepend(str(tmp_path))
+    path = tmp_path / 'cached_bundle.py'
+    path.write_text(BUNDLE)
+    yield path
+    sys.modules.pop('cached_bundle', None)
+
+
+@pytest.fixture
+def settings(tmp_path):
+    return {'BOOT_CACHE': str(tmp_path / 'boot.json')}
+
+
+def boot(settings):
+    sys.modules.pop('cached_bundle', None)
+    framework = create_framework(['cached_bundle'], settings)
+    run(framework.start())
+    return framework
+
+
+def no_find_spec(monkeypatch):
+    def find_spec(name, package=None):
+        raise AssertionError('find_spec called for "{}"'.format(name))
+    monkeypatch.setattr(importlib.util, 'find_spec', find_spec)
+
+
+def test_boot_cache(bundle_file, settings, monkeypatch):
+    boot(settings)
+    with open(settings['BOOT_CACHE']) as cache:
+        entry = json.load(cache)['bundles']['cached_bundle']
+    assert entry['origin'] == str(bundle_file)
+    assert entry['provides'] == ['cached.IService']
+
+    sys.modules.pop('cached_bundle')
+    with monkeypatch.context() as patch:
+        no_find_spec(patch)
+        framework = create_framework(['cached_bundle'], settings)
+    assert not framework.bundles[0].loaded
+    run(framework.start())
+    assert framework.bundles[0].loaded
+    assert framework.get_service_reference('cached.IService') is not None
+
+
+def test_changed_module(bundle_file, settings):
+    boot(settings)
+    os.utime(str(bundle_file), ns=(0, 0))
+    cache = BootCache(settings['BOOT_CACHE'], settings)
+    assert cache.spec('cached_bundle') is None
+
+
+def test_changed_settings(bundle_file, settings):
+    boot(settings)
+    cache = BootCache(settings['BOOT_CACHE'], settings)
+    assert cache.spec('cached_bundle') is not None
+    cache = BootCache(settings['BOOT_CACHE'], dict(settings, DEBUG=True))
+    assert cache.spec('cached_bundle') is None
+
+
+def test_changed_package_module(tmp_path, settings, monkeypatch):
+    monkeypatch.syspath_prepend(str(tmp_path))
+    package = tmp_path / 'cached_package'
+    package.mkdir()
+    package.joinpath('__init__.py').write_text(
+        'from .activator import Activator\n')
+    package.joinpath('activator.py').write_text(BUNDLE)
+    cache = BootCache(settings['BOOT_CACHE'], settings)
+    cache.set_spec('cached_package',
+                   importlib.util.find_spec('cached_package'))
+    cache.save()
+    assert BootCache(settings['BOOT_CACHE'], settings).spec(
+        'cached_package') is not None
+
+    os.utime(str(package / 'activator.py'), ns=(0, 0))
+    cache = BootCache(settings['BOOT_CACHE'], settings)
+    assert cache.spec('cached_package') is None
+
+
+def test_package_key_computed_once(tmp_path, settings, monkeypatch):
+    monkeypatch.syspath_prepend(str(tmp_path))
+    package = tmp_path / 'cached_package'
+    package.mkdir()
+    package.joinpath('__init__.py').write_text('')
+    cache = BootCache(settings['BOOT_CACHE'], settings)
+    cache.set_spec('cached_package',
+                   importlib.util.find_spec('cached_package'))
+    cache.save()
+
+    walked = []
+    walk = os.walk
+
+    def counting_walk(*args, **kwargs):
+        walked.append(args[0])
+        return walk(*args, **kwargs)
+    monkeypatch.setattr(os, 'walk', counting_walk)
+    bundle = types.SimpleNamespace(name='cached_package')
+    cache = BootCache(settings['BOOT_CACHE'], settings)
+    assert cache.spec('cached_package') is not None
+    assert cache.metadata(bundle) is None
+    cache.set_metadata(bundle, (['a.IService'], []))
+    assert cache.metadata(bundle) == (('a.IService', ), ())
+    assert walked == [str(package)]
+
+
+@pytest.mark.parametrize('entry', [
+    None,
+    {},
+    {'origin': 'cached_bundle.py'},
+    {'origin': 'cached_bundle.py', 'key': [1, 2]},
+    {'origin': None, 'key': [1, 2], 'package': False},
+    {'origin': 'cached_bundle.py', 'key': [1, 2], 'package': False,
+     'requires': []},
+    {'origin': 'cached_bundle.py', 'key': [1, 2], 'package': False,
+     'requires': None, 'provides': [1]},
+])
+def test_invalid_entry(bundle_file, settings, entry):
+    boot(settings)
+    with open(settings['BOOT_CACHE']) as cache:
+        data = json.load(cache)
+    data['bundles']['cached_bundle'] = entry
+    with open(settings['BOOT_CACHE'], 'w') as cache:
+        json.dump(data, cache)
+
+    cache = BootCache(settings['BOOT_CACHE'], settings)
+    assert cache.spec('cached_bundle') is None
+    boot(settings)
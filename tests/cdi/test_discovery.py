@@ -0,0 +1,132 @@
+import json
+import os
+import sys
+
+import pytest
+
+from atto.cdi.bundle import BundleContext
+from atto.cdi.discovery import (Manifest, find_bundles, has_activator,
+                                source_metadata)
+from atto.cdi.errors import BundleException
+from atto.cdi.framework import Framework
+
+
+@pytest.mark.parametrize('source', [
+    '@activator\nclass Activator:\n    pass\n',
+    '@cdi.activator\nclass Activator:\n    pass\n',
+    '__activator__ = Activator()\n',
+    'globals()[ACTIVATOR] = Activator()\n',
+    'globals()["__activator__"] = Activator()\n',
+    'setattr(module, ACTIVATOR, Activator())\n',
+])
+def test_has_activator(source):
+    assert has_activator(source)
+
+
+@pytest.mark.parametrize('source', [
+    'class Activator:\n    pass\n',
+    'def start():\n    activator = None\n',
+    '# @activator\n',
+    '@activator\nclass Broken(\n',
+])
+def test_has_not_activator(source):
+    assert not has_activator(source)
+
+
+@pytest.mark.parametrize('source, metadata', [
+    ('@activator\nclass A:\n    requires = ("a.I", )\n'
+     '    provides = "b.I"\n', (('a.I', ), ('b.I', ))),
+    ('class I:\n    pass\n@activator\nclass A:\n    provides = [I]\n',
+     ((), ('meta.I', ))),
+    ('from atto.cdi import Framework\n__requires__ = (Framework, )\n'
+     'class A:\n    pass\n__activator__ = A()\n',
+     (('atto.cdi.framework.Framework', ), ())),
+    ('import atto.cdi.registry\nclass A:\n'
+     '    provides = (atto.cdi.registry.ServiceRegistry, )\n'
+     'globals()[ACTIVATOR] = A()\n',
+     ((), ('atto.cdi.registry.ServiceRegistry', ))),
+    ('@activator\nclass A:\n    pass\n', (None, None)),
+])
+def test_source_metadata(tmp_path, source, metadata):
+    path = tmp_path / 'meta.py'
+    path.write_text(source)
+    assert source_metadata(str(path), 'meta') == metadata
+
+
+@pytest.mark.parametrize('source', [
+    'class A:\n    pass\n',
+    '@activator\nclass A:\n    provides = make()\n',
+    'from .api import I\n@activator\nclass A:\n    provides = (I, )\n',
+    'from api import Missing\n@activator\nclass A:\n'
+    '    provides = (Missing, )\n',
+    '__activator__ = create()\n',
+])
+def test_source_metadata_unknown(tmp_path, source):
+    path = tmp_path / '__init__.py'
+    path.write_text(source)
+    assert source_metadata(str(path), 'meta', True) is None
+
+
+PLUGIN = 'from atto_api.cdi import activator\n\n' \
+         '@activator\nclass Plugin:\n    pass\n'
+
+
+@pytest.fixture
+def plugins(tmp_path, monkeypatch):
+    monkeypatch.syspath_prepend(str(tmp_path))
+    root = tmp_path / 'plugins'
+    nested = root / 'nested'
+    nested.mkdir(parents=True)
+    root.joinpath('__init__.py').write_text('')
+    root.joinpath('first.py').write_text(PLUGIN)
+    root.joinpath('helpers.py').write_text('VALUE = 1\n')
+    root.joinpath('_private.py').write_text(PLUGIN)
+    nested.joinpath('__init__.py').write_text('')
+    nested.joinpath('second.py').write_text(PLUGIN)
+    yield root
+    for name in list(sys.modules):
+        if name.startswith('plugins'):
+            del sys.modules[name]
+
+
+def test_find_bundles(plugins):
+    assert find_bundles(str(plugins)) == ['plugins.first']
+    assert find_bundles('plugins', recursive=True) == [
+        'plugins.first', 'plugins.nested.second']
+    assert 'plugins.first' not in sys.modules
+
+
+def test_find_bundles_not_package(tmp_path):
+    with pytest.raises(BundleException):
+        find_bundles(str(tmp_path))
+    with pytest.raises(BundleException):
+        find_bundles('not_existing_package')
+
+
+def test_manifest(plugins, tmp_path):
+    path = str(tmp_path / 'manifest.json')
+    find_bundles(str(plugins), manifest=Manifest(path))
+    with open(path) as manifest:
+        entries = json.load(manifest)['modules']
+    first = str(plugins / 'first.py')
+    assert entries[first][2] is True
+
+    # cached result is used while file is not changed
+    entries[first][2] = False
+    with open(path, 'w') as manifest:
+        json.dump({'version': Manifest.VERSION, 'modules': entries}, manifest)
+    assert find_bundles(str(plugins), manifest=Manifest(path)) == []
+
+    os.utime(first, ns=(0, 0))
+    assert find_bundles(str(plugins), manifest=Manifest(path)) == [
+        'plugins.first']
+
+
+def test_install_package(plugins):
+    framework = Framework({})
+    context = BundleContext(framework, framework)
+    bundles = context.install_package('plugins', recursive=True)
+    assert [bundle.name for bundle in bundles] == [
+        'plugins.first', 'plugins.nested.second']
+    assert not any(bundle.loaded for bundle in bundles)
+    assert framework.bundles == bundles
@@ -0,0 +1,112 @@
+import pytest
+
+from atto.cdi import (SCOPE_BUNDLE, SCOPE_PROTOTYPE, SCOPE_SINGLETON,
+                      ServiceFactory)
+from atto.cdi.bundle import Bundle, BundleContext
+from atto.cdi.errors import BundleException
+from atto.cdi.framework import Framework
+
+
+class Factory(ServiceFactory):
+    def __init__(self):
+        self.created = []
+        self.released = []
+
+    def get_service(self, bundle, registration):
+        service = object()
+        self.created.append((bundle, service))
+        return service
+
+    def unget_service(self, bundle, registration, service):
+        self.released.append((bundle, service))
+
+
+@pytest.fixture
+def framework():
+    return Framework({})
+
+
+@pytest.fixture
+def context(framework):
+    return BundleContext(framework, framework)
+
+
+@pytest.fixture
+def bundles(framework):
+    return [Bundle(framework, index, 'bundle', None) for index in (1, 2)]
+
+
+def register(context, factory, scope):
+    registration = context.register_factory(
+        'IService', factory, {'name': 'lazy'}, scope=scope)
+    return registration, registration.get_reference()
+
+
+def test_lazy(context):
+    factory = Factory()
+    registration, ref = register(context, factory, SCOPE_SINGLETON)
+    assert factory.created == []
+    assert ref.get_property('service.scope') == SCOPE_SINGLETON
+    assert context.get_service_reference('IService', '(name=lazy)') == ref
+
+
+def test_singleton(framework, context, bundles):
+    factory = Factory()
+    registration, ref = register(context, factory, SCOPE_SINGLETON)
+    first, second = bundles
+    service = framework.get_service(first, ref)
+    assert framework.get_service(second, ref) is service
+    framework.unget_service(first, ref)
+    framework.unget_service(second, ref)
+    assert factory.released == []
+
+    registration.unregister()
+    assert factory.released == [(framework, service)]
+
+
+def test_bundle_scope(framework, context, bundles):
+    factory = Factory()
+    registration, ref = register(context, factory, SCOPE_BUNDLE)
+    first, second = bundles
+    service = framework.get_service(first, ref)
+    assert framework.get_service(first, ref) is service
+    assert framework.get_service(second, ref) is not service
+    assert len(factory.created) == 2
+
+    framework.unget_service(first, ref)
+    assert factory.released == []
+    framework.unget_service(first, ref)
+    assert factory.released == [(first, service)]
+
+    registration.unregister()
+    assert len(factory.released) == 2
+
+
+def test_prototype(framework, context, bundles):
+    factory = Factory()
+    registration, ref = register(context, factory, SCOPE_PROTOTYPE)
+    first = bundles[0]
+    service = framework.get_service(first, ref)
+    other = framework.get_service(first, ref)
+    assert service is not other
+
+    framework.unget_service(first, ref, service)
+    assert factory.released == [(first, service)]
+    registration.unregister()
+    assert factory.released == [(first, service), (first, other)]
+
+
+def test_callable(context):
+    registration, ref = register(context, dict, SCOPE_SINGLETON)
+    assert context.get_service(ref) == {}
+
+
+def test_invalid_scope(context):
+    with pytest.raises(BundleException):
+        register(context, Factory(), 'unknown')
+
+
+def test_factory_returns_none(context):
+    registration, ref = register(context, lambda: None, SCOPE_SINGLETON)
+    with pytest.raises(BundleException):
+        context.get_service(ref)
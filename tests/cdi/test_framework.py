@@ -0,0 +1,417 @@
+import asyncio
+import os
+import sys
+import threading
+import types
+
+import pytest
+from atto_api.cdi.consts import ACTIVATOR
+
+from atto.cdi import ServiceEvent, Timeline
+from atto.cdi.errors import BundleException, FrameworkException
+from atto.cdi.framework import Framework, StopResult
+
+
+def run(coro):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+class Activator:
+    def __init__(self, name, log, requires=None, provides=None, delay=0,
+                 fail=False):
+        self.name = name
+        self.log = log
+        if requires is not None:
+            self.requires = requires
+        if provides is not None:
+            self.provides = provides
+        self.delay = delay
+        self.fail = fail
+
+    async def start(self, ctx):
+        self.log.append(('start', self.name))
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError('failed')
+        for spec in getattr(self, 'provides', ()):
+            ctx.register_service(spec, object())
+        self.log.append(('started', self.name))
+
+    async def stop(self, ctx):
+        self.log.append(('stop', self.name))
+
+
+@pytest.fixture
+def install():
+    names = []
+
+    def install(framework, name, activator):
+        module = types.ModuleType(name)
+        setattr(module, ACTIVATOR, activator)
+        sys.modules[name] = module
+        names.append(name)
+        framework.install_bundle(name)
+    yield install
+    for name in names:
+        sys.modules.pop(name, None)
+
+
+def test_start_independent_concurrently(install):
+    framework = Framework({})
+    log = []
+    install(framework, 'slow', Activator('slow', log, [], ['a'], 0.02))
+    install(framework, 'fast', Activator('fast', log, [], ['b']))
+    install(framework, 'user', Activator('user', log, ['a', 'b'], []))
+    run(framework.start())
+    assert log == [
+        ('start', 'slow'), ('start', 'fast'), ('started', 'fast'),
+        ('started', 'slow'), ('start', 'user'), ('started', 'user'),
+    ]
+
+
+def test_undeclared_bundles_keep_install_order(install):
+    framework = Framework({})
+    log = []
+    install(framework, 'first', Activator('first', log, delay=0.01))
+    install(framework, 'second', Activator('second', log))
+    run(framework.start())
+    assert log == [('start', 'first'), ('started', 'first'),
+                   ('start', 'second'), ('started', 'second')]
+
+
+def test_failed_required_bundle(install):
+    framework = Framework({})
+    log = []
+    install(framework, 'broken', Activator('broken', log, [], ['a'],
+                                           fail=True))
+    install(framework, 'user', Activator('user', log, ['a'], []))
+    install(framework, 'other', Activator('other', log, [], []))
+    run(framework.start())
+    assert ('start', 'user') not in log
+    assert ('started', 'other') in log
+
+
+def test_dependency_cycle(install):
+    framework = Framework({})
+    log = []
+    install(framework, 'one', Activator('one', log, ['b'], ['a']))
+    install(framework, 'two', Activator('two', log, ['a'], ['b']))
+    with pytest.raises(FrameworkException) as info:
+        run(framework.start())
+    assert 'one -> two -> one' in str(info.value)
+    assert log == []
+
+
+class Hanging(Activator):
+    async def stop(self, ctx):
+        self.log.append(('stop', self.name))
+        await asyncio.sleep(10)
+
+
+def test_stop_reverse_dependencies(install):
+    framework = Framework({})
+    log = []
+    install(framework, 'base', Activator('base', log, [], ['a']))
+    install(framework, 'user', Activator('user', log, ['a'], []))
+    install(framework, 'other', Activator('other', log, [], []))
+
+    async def main():
+        await framework.start()
+        del log[:]
+        return await framework.stop()
+    report = run(main())
+    assert log.index(('stop', 'user')) < log.index(('stop', 'base'))
+    assert {item.name: item.status for item in report} == {
+        'base': StopResult.STOPPED, 'user': StopResult.STOPPED,
+        'other': StopResult.STOPPED}
+
+
+def test_stop_bundle_installed_after_start(install):
+    framework = Framework({})
+    log = []
+    install(framework, 'base', Activator('base', log, [], ['a']))
+
+    async def main():
+        await framework.start()
+        install(framework, 'late', Activator('late', log, ['a'], []))
+        await framework._start_bundle(framework.get_bundle_by_name('late'))
+        del log[:]
+        return await framework.stop()
+    report = run(main())
+    assert log == [('stop', 'late'), ('stop', 'base')]
+    assert {item.name: item.status for item in report} == {
+        'base': StopResult.STOPPED, 'late': StopResult.STOPPED}
+
+
+class StartOnly:
+    def start(self, ctx):
+        ctx.register_service('start.only', object())
+
+
+def test_stop_without_stop_method(install):
+    framework = Framework({})
+    install(framework, 'start_only', StartOnly())
+    run(framework.start())
+    assert framework.get_service_reference('start.only') is not None
+    run(framework.stop())
+    assert framework.get_service_reference('start.only') is None
+
+
+def test_stop_timeout(install):
+    framework = Framework({'BUNDLE_STOP_TIMEOUT': 0.01})
+    log = []
+    install(framework, 'base', Activator('base', log, [], ['a']))
+    install(framework, 'hanging', Hanging('hanging', log, ['a'], ['b']))
+
+    async def main():
+        await framework.start()
+        return await framework.stop()
+    report = {item.name: item for item in run(main())}
+    assert report['hanging'].status == StopResult.TIMEOUT
+    assert report['hanging'].duration < 1
+    assert report['base'].status == StopResult.STOPPED
+    assert framework.get_service_reference('b') is None
+    assert framework.get_service_reference('a') is None
+
+
+def test_stop_global_timeout(install):
+    framework = Framework({'FRAMEWORK_STOP_TIMEOUT': 0.01})
+    log = []
+    install(framework, 'first', Hanging('first', log, [], []))
+    install(framework, 'second', Hanging('second', log, [], []))
+
+    async def main():
+        await framework.start()
+        return await framework.stop()
+    report = run(main())
+    assert [item.status for item in report] == [StopResult.TIMEOUT] * 2
+
+
+class Blocking:
+    requires = ()
+    provides = ()
+
+    def __init__(self, barrier, blocking=None):
+        self.barrier = barrier
+        self.threads = []
+        if blocking is not None:
+            self.blocking = blocking
+
+    def start(self, ctx):
+        self.threads.append(threading.current_thread().name)
+        self.barrier.wait()
+        ctx.register_service('blocking', object())
+
+
+@pytest.mark.parametrize('workers', [0, 2])
+def test_blocking_activators_in_executor(install, workers):
+    framework = Framework({'ACTIVATOR_EXECUTOR': True,
+                           'ACTIVATOR_EXECUTOR_WORKERS': workers})
+    barrier = threading.Barrier(2, timeout=5)
+    first = Blocking(barrier)
+    second = Blocking(barrier)
+    install(framework, 'first', first)
+    install(framework, 'second', second)
+    run(framework.start())
+    assert first.threads[0].startswith('atto-activator')
+    assert len(framework.get_service_references('blocking')) == 2
+
+
+def test_blocking_marker(install):
+    framework = Framework({})
+    barrier = threading.Barrier(1)
+    marked = Blocking(barrier, blocking=True)
+    inline = Blocking(barrier)
+    install(framework, 'marked', marked)
+    install(framework, 'inline', inline)
+    run(framework.start())
+    assert marked.threads[0].startswith('atto-activator')
+    assert inline.threads == [threading.current_thread().name]
+
+
+@pytest.fixture
+def package(tmp_path, monkeypatch):
+    monkeypatch.syspath_prepend(str(tmp_path))
+    names = []
+
+    def write(name, source):
+        tmp_path.joinpath(name + '.py').write_text(source)
+        names.append(name)
+    yield write
+    for name in names:
+        sys.modules.pop(name, None)
+
+
+def test_install_defers_import(package):
+    package('deferred_bundle', (
+        'from atto_api.cdi.consts import ACTIVATOR\n'
+        'class Activator:\n'
+        '    def start(self, ctx):\n'
+        '        ctx.register_service("deferred", object())\n'
+        'globals()[ACTIVATOR] = Activator()\n'))
+    framework = Framework({})
+    bundle = framework.install_bundle('deferred_bundle')
+    assert framework.install_bundle('deferred_bundle') is bundle
+    assert not bundle.loaded
+    assert 'deferred_bundle' not in sys.modules
+    assert framework.import_times() == {}
+
+    run(framework.start())
+    assert bundle.loaded
+    assert list(framework.import_times()) == ['deferred_bundle']
+    assert framework.get_service_reference('deferred') is not None
+
+
+def test_import_after_dependencies(package):
+    package('deferred_consumer', (
+        'from atto_api.cdi import activator\n'
+        '@activator\n'
+        'class Activator:\n'
+        '    requires = ("deferred.IProvided", )\n'
+        '    def start(self, ctx):\n'
+        '        pass\n'))
+    package('deferred_provider', (
+        'from atto_api.cdi import activator\n'
+        '@activator\n'
+        'class Activator:\n'
+        '    provides = ("deferred.IProvided", )\n'
+        '    def start(self, ctx):\n'
+        '        ctx.register_service("deferred.IProvided", object())\n'))
+    timeline = Timeline()
+    framework = Framework({}, timeline)
+    framework.install_bundle('deferred_consumer')
+    framework.install_bundle('deferred_provider')
+    run(framework.start())
+    events = {(event.category, event.name): event
+              for event in timeline.events()}
+    started = events['start', 'deferred_provider']
+    assert events['import', 'deferred_consumer'].start >= \
+        started.start + started.duration
+    assert ('start', 'deferred_consumer') in events
+
+
+def test_start_required_providers(package):
+    source = (
+        'from atto_api.cdi import activator\n'
+        '@activator\n'
+        'class Activator:\n'
+        '    requires = {}\n'
+        '    provides = {}\n'
+        '    def start(self, ctx):\n'
+        '        pass\n')
+    package('partial_storage', source.format((), ('partial.IStorage', )))
+    package('partial_web', source.format(
+        ('partial.IStorage', ), ('partial.IWeb', )))
+    package('partial_mail', source.format((), ('partial.IMail', )))
+    framework = Framework({})
+    for name in ('partial_storage', 'partial_web', 'partial_mail'):
+        framework.install_bundle(name)
+    run(framework.start(('partial.IWeb', )))
+    assert sorted(framework.import_times()) == [
+        'partial_storage', 'partial_web']
+    assert 'partial_mail' not in sys.modules
+
+
+def test_install_missing_bundle():
+    framework = Framework({})
+    with pytest.raises(BundleException):
+        framework.install_bundle('not_existing_bundle')
+
+
+def test_import_error_on_start(package, install):
+    package('broken_bundle', 'raise ImportError("broken")\n')
+    framework = Framework({})
+    log = []
+    framework.install_bundle('broken_bundle')
+    install(framework, 'other', Activator('other', log))
+    run(framework.start())
+    assert log == [('start', 'other'), ('started', 'other')]
+
+
+BUNDLE_SOURCE = '''
+from atto_api.cdi.consts import ACTIVATOR
+from .impl import VERSION
+
+
+class Activator:
+    def start(self, ctx):
+        ctx.register_service('updated.IService', object(),
+                             {'version': VERSION})
+
+    def stop(self, ctx):
+        pass
+
+
+globals()[ACTIVATOR] = Activator()
+'''
+
+
+@pytest.fixture
+def bundle_package(tmp_path, monkeypatch):
+    monkeypatch.syspath_prepend(str(tmp_path))
+    path = tmp_path / 'updated_bundle'
+    path.mkdir()
+    path.joinpath('__init__.py').write_text(BUNDLE_SOURCE)
+
+    def write_version(source, mtime):
+        impl = path / 'impl.py'
+        impl.write_text(source)
+        os.utime(str(impl), (mtime, mtime))
+    write_version('VERSION = 1\n', 1000000000)
+    yield write_version
+    for name in list(sys.modules):
+        if name.startswith('updated_bundle'):
+            del sys.modules[name]
+
+
+def test_update_bundle(bundle_package):
+    framework = Framework({})
+    bundle = framework.install_bundle('updated_bundle')
+    events = []
+
+    class Listener:
+        def service_changed(self, event):
+            events.append(
+                (event.type, event.reference.get_property('version')))
+
+    async def main():
+        await framework.start()
+        framework.add_service_listener(
+            framework, Listener(), 'updated.IService')
+        bundle_package('VERSION = 22\n', 1000000100)
+        assert await framework.update_bundle('updated_bundle') is bundle
+    run(main())
+
+    ref = framework.get_service_reference('updated.IService')
+    assert ref.get_property('version') == 22
+    assert ref.get_bundle() is bundle
+    assert events == [(ServiceEvent.UNREGISTERING, 1),
+                      (ServiceEvent.REGISTERED, 22)]
+    assert framework.get_bundle(bundle.id) is bundle
+    assert framework.get_bundle(0) is framework
+    assert framework.get_bundle_by_name('updated_bundle') is bundle
+
+
+def test_update_bundle_import_error(bundle_package):
+    framework = Framework({})
+    framework.install_bundle('updated_bundle')
+
+    async def main():
+        await framework.start()
+        bundle_package('VERSION = (\n', 1000000100)
+        with pytest.raises(BundleException):
+            await framework.update_bundle('updated_bundle')
+    run(main())
+
+    ref = framework.get_service_reference('updated.IService')
+    assert ref.get_property('version') == 1
+
+
+def test_update_not_installed_bundle():
+    framework = Framework({})
+    with pytest.raises(BundleException):
+        run(framework.update_bundle('not_installed'))
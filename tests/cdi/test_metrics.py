@@ -0,0 +1,58 @@
+import json
+
+from atto.cdi import RegistryMetrics
+from atto.cdi.bundle import Bundle
+from atto.cdi.framework import Framework
+from atto.cdi.metrics import ANY_CLASS
+
+
+class IService:
+    pass
+
+
+def test_disabled():
+    framework = Framework({})
+    assert framework.get_service_reference(RegistryMetrics) is None
+
+
+def test_metrics():
+    framework = Framework({'REGISTRY_METRICS': True})
+    ref = framework.get_service_reference(RegistryMetrics)
+    metrics = framework.get_service(framework, ref)
+    metrics.reset()
+
+    bundle = Bundle(framework, 1, 'consumer', None)
+    framework.register_service(framework, IService, object(), {'name': 'a'})
+    for _ in range(3):
+        ref = framework.get_service_reference(IService, '(name=a)')
+    framework.get_service_reference('other.IService')
+    framework.get_service(bundle, ref)
+
+    data = metrics.as_dict()
+    lookups = data['lookups']
+    assert lookups['total'] == 4
+    assert lookups['cache_hits'] == 2
+    assert lookups['cache_misses'] == 2
+    assert lookups['filters'] == {'(name=a)': 3}
+    assert sum(data['latency']['lookup']) == 4
+    assert sum(data['latency']['get_service']) == 1
+    assert data['use_counts'] == {ref.get_property('service.id'): {
+        'consumer': 1}}
+    assert metrics.hot_classes(1) == [('tests.cdi.test_metrics.IService', 3)]
+
+
+def test_lookup_without_class():
+    framework = Framework({'REGISTRY_METRICS': True})
+    ref = framework.get_service_reference(RegistryMetrics)
+    metrics = framework.get_service(framework, ref)
+    metrics.reset()
+
+    framework.register_service(framework, IService, object(), {'name': 'a'})
+    framework.get_service_references(None, '(name=a)')
+    framework.get_service_reference(IService)
+
+    data = metrics.as_dict()
+    assert data['lookups']['classes'] == {
+        ANY_CLASS: 1, 'tests.cdi.test_metrics.IService': 1}
+    assert metrics.hot_classes() == [('tests.cdi.test_metrics.IService', 1)]
+    json.dumps(data, sort_keys=True)
@@ -0,0 +1,189 @@
+import pytest
+
+from atto.cdi import ServiceFactory
+from atto.cdi.errors import BundleException
+from atto.cdi.framework import Framework
+from atto.cdi.registry import ServiceRegistry
+
+
+class IService:
+    pass
+
+
+@pytest.fixture
+def framework():
+    return Framework({})
+
+
+def register(framework, name, **properties):
+    properties['name'] = name
+    return framework.register_service(
+        framework, IService, object(), properties)
+
+
+def test_find_by_class(framework):
+    register(framework, 'first')
+    register(framework, 'second', **{'service.ranking': 10})
+    refs = framework.get_service_references(IService)
+    assert [ref.get_property('name') for ref in refs] == ['second', 'first']
+    ref = framework.get_service_reference(IService)
+    assert ref.get_property('name') == 'second'
+    assert framework.get_service_reference('not.Registered') is None
+
+
+def test_find_with_filter(framework):
+    register(framework, 'redis', group='cache')
+    register(framework, 'psql', group='db', **{'service.ranking': 5})
+    register(framework, 'mysql', group='db')
+
+    refs = framework.get_service_references(IService, '(group=db)')
+    assert [ref.get_property('name') for ref in refs] == ['psql', 'mysql']
+    refs = framework.get_service_references(None, '(name=redis)')
+    assert [ref.get_property('name') for ref in refs] == ['redis']
+    refs = framework.get_service_references(
+        IService, '(service.ranking>=5)')
+    assert [ref.get_property('name') for ref in refs] == ['psql']
+
+
+def test_unregister(framework):
+    registration = register(framework, 'redis')
+    ref = registration.get_reference()
+    assert framework.get_service(framework, ref)
+    registration.unregister()
+    assert framework.get_service_reference(IService) is None
+
+
+def test_indexed_lookup(framework):
+    for index in range(50):
+        register(framework, 'service{}'.format(index), group=index % 5)
+    register(framework, 'redis', tags=['cache', 'session'])
+    register(framework, 'dict', tags=[{}], extra={'a': 1})
+
+    def names(filter):
+        refs = framework.get_service_references(IService, filter)
+        return sorted(ref.get_property('name') for ref in refs)
+
+    assert names('(name=service7)') == ['service7']
+    assert names('(|(name=service7)(name=service8))') == [
+        'service7', 'service8']
+    assert names('(&(name=service*)(service.id=3))') == ['service2']
+    assert names('(tags=cache)') == ['redis']
+    assert names('(extra=*)') == ['dict']
+    assert names('(name=missing)') == []
+    assert names({'group': 7}) == []
+    assert len(names({'group': [1, 2]})) == 20
+
+
+def test_index_after_unregister(framework):
+    registration = register(framework, 'redis')
+    register(framework, 'psql')
+    registration.unregister()
+    assert framework.get_service_references(IService, '(name=redis)') == ()
+    assert framework.get_service_references(None, '(name=redis)') == ()
+
+
+def test_register_many(framework):
+    register(framework, 'single', **{'service.ranking': 5})
+    registrations = framework.register_many(framework, [
+        (IService, object(), {'name': 'first'}),
+        (IService, object(), {'name': 'second', 'service.ranking': 10}),
+        (IService, object()),
+    ])
+    assert len(registrations) == 3
+    refs = framework.get_service_references(IService)
+    assert [ref.get_property('name') for ref in refs] == [
+        'second', 'single', 'first', None]
+
+    registrations[1].unregister()
+    refs = framework.get_service_references(IService)
+    assert [ref.get_property('name') for ref in refs] == [
+        'single', 'first', None]
+
+
+def test_register_many_invalid(framework):
+    with pytest.raises(BundleException):
+        framework.register_many(framework, [(IService, None, {})])
+
+
+class Factory(ServiceFactory):
+    def get_service(self, bundle, registration):
+        return object()
+
+
+@pytest.mark.parametrize('invalid', [
+    (object(), object(), {}),
+    ('IA', Factory(), {'service.scope': 'unknown'}),
+])
+def test_register_many_atomic(framework, invalid):
+    service = object()
+    with pytest.raises(BundleException):
+        framework.register_many(
+            framework, [('IA', service, {}), ('IA', service, {}), invalid])
+    assert framework.get_service_references('IA') == ()
+    assert framework.get_service_references(None) == ()
+
+
+def test_cached_lookup():
+    registry = ServiceRegistry(Framework({}))
+    bundle = Framework({})
+    registry.register(bundle, IService, object(), {'name': 'redis'})
+    generation = registry.generation
+
+    refs = registry.find_service_references(IService, '(name=redis)')
+    assert isinstance(refs, tuple)
+    assert registry.find_service_references(
+        IService, '(name=redis)') is refs
+    assert registry.generation == generation
+
+    registration = registry.register(
+        bundle, IService, object(), {'name': 'redis'})
+    assert registry.generation == generation + 1
+    assert len(registry.find_service_references(
+        IService, '(name=redis)')) == 2
+
+    registration.unregister()
+    assert registry.generation == generation + 2
+    assert registry.find_service_references(
+        IService, '(name=redis)') == refs
+
+
+def test_readonly_properties(framework):
+    properties = {'name': 'redis'}
+    ref = framework.register_service(
+        framework, IService, object(), properties).get_reference()
+    properties['name'] = 'changed'
+    view = ref.get_properties()
+    assert view['name'] == 'redis'
+    with pytest.raises(TypeError):
+        view['name'] = 'psql'
+
+
+def test_registry_copies_properties():
+    registry = ServiceRegistry(Framework({}))
+    properties = {'name': 'redis'}
+    ref = registry.register(
+        Framework({}), IService, object(), properties).get_reference()
+    properties['name'] = 'changed'
+    assert properties == {'name': 'changed'}
+    assert ref.get_property('name') == 'redis'
+    assert registry.find_service_reference(IService, '(name=redis)') is ref
+
+
+def test_set_properties(framework):
+    first = register(framework, 'first')
+    second = register(framework, 'second')
+    ref = second.get_reference()
+    version = ref.version
+
+    second.set_properties({'name': 'psql', 'service.ranking': 10})
+    assert ref.version == version + 1
+    assert ref.get_property('service.id') == 2
+    assert ref.get_property('objectClass') == (
+        first.get_reference().get_property('objectClass'))
+    assert framework.get_service_reference(IService) == ref
+    assert framework.get_service_reference(IService, '(name=second)') is None
+    assert framework.get_service_reference(IService, '(name=psql)') == ref
+
+    second.unregister()
+    with pytest.raises(BundleException):
+        second.set_properties({})
@@ -0,0 +1,53 @@
+from atto_api.cdi.consts import OBJECTCLASS
+
+from atto.cdi.framework import Framework
+
+
+class IBase:
+    pass
+
+
+class IService(IBase):
+    pass
+
+
+class Service(IService):
+    pass
+
+
+def test_exact_classes_by_default():
+    framework = Framework({})
+    framework.register_service(framework, Service, Service())
+    assert framework.get_service_reference(Service) is not None
+    assert framework.get_service_reference(IBase) is None
+
+
+def test_lookup_by_base_class():
+    framework = Framework({'REGISTRY_INDEX_MRO': True})
+    reg = framework.register_service(framework, Service, Service(),
+                                     {'name': 'a'})
+    ref = reg.get_reference()
+    assert ref.get_property(OBJECTCLASS) == (
+        'tests.cdi.test_registry_mro.Service', )
+    assert framework.get_service_reference(IBase) is ref
+    assert framework.get_service_reference(IService, '(name=a)') is ref
+    assert framework.get_service_reference(object) is None
+
+    reg.set_properties({'name': 'b'})
+    assert framework.get_service_references(IBase, '(name=b)') == (ref, )
+
+    reg.unregister()
+    assert framework.get_service_reference(IBase) is None
+
+
+def test_listener_by_base_class():
+    framework = Framework({'REGISTRY_INDEX_MRO': True})
+    events = []
+
+    class Listener:
+        def service_changed(self, event):
+            events.append(event.type)
+
+    framework.add_service_listener(framework, Listener(), IBase)
+    framework.register_service(framework, [Service, 'other'], Service())
+    assert events == [1]
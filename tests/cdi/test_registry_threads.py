@@ -0,0 +1,156 @@
+import threading
+
+from atto.cdi.bundle import BundleContext
+from atto.cdi.errors import BundleException
+from atto.cdi.framework import Framework
+
+THREADS = 8
+ITERATIONS = 200
+
+
+class IService:
+    pass
+
+
+def test_concurrent_register_and_lookup():
+    framework = Framework({})
+    context = BundleContext(framework, framework)
+    tracker = context.track_services(IService, '(group=*)')
+    errors = []
+    barrier = threading.Barrier(THREADS * 2)
+    written = [threading.Event() for _ in range(THREADS)]
+
+    def writer(number):
+        try:
+            barrier.wait()
+            for index in range(ITERATIONS):
+                properties = {'group': number, 'service.ranking': index % 7}
+                registration = context.register_service(
+                    IService, object(), properties)
+                if index % 2:
+                    # ranking is kept, readers check order
+                    registration.set_properties(properties)
+                if index % 3:
+                    registration.unregister()
+        except Exception as ex:
+            errors.append(ex)
+        finally:
+            written[number].set()
+
+    def reader(number):
+        try:
+            barrier.wait()
+            found = 0
+            # reads while writer works and once after it
+            while True:
+                done = written[number].is_set()
+                refs = context.get_service_references(
+                    IService, {'group': number})
+                assert list(refs) == sorted(refs)
+                found += len(refs)
+                for ref in refs:
+                    assert ref.get_property('group') == number
+                    try:
+                        context.get_service(ref)
+                    except BundleException:
+                        # unregistered by writer after lookup
+                        continue
+                    context.unget_service(ref)
+                tracked = tracker.get_service_references()
+                assert list(tracked) == sorted(tracked)
+                if done:
+                    break
+            assert found
+        except Exception as ex:
+            errors.append(ex)
+
+    threads = [threading.Thread(target=writer, args=(number, ))
+               for number in range(THREADS)]
+    threads += [threading.Thread(target=reader, args=(number, ))
+                for number in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    expected = len([index for index in range(ITERATIONS) if not index % 3])
+    refs = context.get_service_references(IService)
+    assert len(refs) == expected * THREADS
+    assert tracker.get_service_references() == refs
+    for number in range(THREADS):
+        assert len(context.get_service_references(
+            IService, {'group': number})) == expected
+
+
+def test_listener_waits_for_other_thread():
+    framework = Framework({})
+    context = BundleContext(framework, framework)
+    results = []
+
+    class Listener:
+        def service_changed(self, event):
+            # would deadlock if called with registry lock held
+            def other():
+                results.append(context.get_service_references(
+                    IService, '(name=first)'))
+                context.register_service('other', object())
+            thread = threading.Thread(target=other)
+            thread.start()
+            thread.join(5)
+            results.append(thread.is_alive())
+
+    context.add_service_listener(Listener(), IService)
+    context.register_service(IService, object(), {'name': 'first'})
+    assert len(results[0]) == 1
+    assert results[1] is False
+    assert context.get_service_reference('other') is not None
+
+
+def test_unregistering_service_is_usable():
+    framework = Framework({})
+    context = BundleContext(framework, framework)
+    service = object()
+    seen = []
+
+    class Listener:
+        def service_changed(self, event):
+            if event.type == event.UNREGISTERING:
+                seen.append(context.get_service(event.reference))
+                seen.append(context.get_service_reference(IService))
+
+    registration = context.register_service(IService, service)
+    context.add_service_listener(Listener(), IService)
+    registration.unregister()
+    assert seen == [service, registration.get_reference()]
+    assert context.get_service_reference(IService) is None
+
+
+def test_unregister_waits_for_trackers():
+    framework = Framework({})
+    context = BundleContext(framework, framework)
+    tracker = context.track_services(IService)
+    dispatching = threading.Event()
+    release = threading.Event()
+
+    class SlowListener:
+        def service_changed(self, event):
+            dispatching.set()
+            release.wait(5)
+
+    context.add_service_listener(SlowListener(), 'slow')
+    registration = context.register_service(IService, object())
+    assert tracker.get_service_reference() is not None
+    slow = threading.Thread(
+        target=context.register_service, args=('slow', object()))
+    slow.start()
+    assert dispatching.wait(5)
+    unregister = threading.Thread(target=registration.unregister)
+    unregister.start()
+    unregister.join(0.1)
+    # other thread delivers events, unregister returns after tracker got it
+    assert unregister.is_alive()
+    release.set()
+    unregister.join(5)
+    slow.join(5)
+    assert tracker.get_service_reference() is None
@@ -0,0 +1,85 @@
+import asyncio
+import sys
+import types
+
+import pytest
+from atto_api.cdi.consts import ACTIVATOR
+
+from atto.cdi import Timeline, create_framework
+
+
+class Clock:
+    def __init__(self):
+        self.value = 100.0
+
+    def __call__(self):
+        return self.value
+
+
+def test_span():
+    clock = Clock()
+    timeline = Timeline(clock)
+    clock.value += 1
+    with timeline.span('bundle', 'start', 2, size=1) as args:
+        clock.value += 0.5
+        args['status'] = 'ok'
+    timeline.mark('ready', 'app')
+
+    first, second = timeline.events()
+    assert first.as_dict() == {
+        'name': 'bundle', 'category': 'start', 'start': 1.0,
+        'duration': 0.5, 'track': 2, 'args': {'size': 1, 'status': 'ok'}}
+    assert second.start == 1.5 and second.duration == 0.0
+    assert [event.name for event in timeline.breakdown()] == [
+        'bundle', 'ready']
+
+
+def test_trace():
+    clock = Clock()
+    timeline = Timeline(clock)
+    with timeline.span('bundle', 'start'):
+        clock.value += 0.002
+    timeline.mark('ready', 'app')
+
+    span, mark = timeline.as_trace()['traceEvents']
+    assert span['ph'] == 'X'
+    assert span['ts'] == 0 and span['dur'] == pytest.approx(2000)
+    assert mark['ph'] == 'i' and 'dur' not in mark
+
+
+class Activator:
+    async def start(self, ctx):
+        ctx.register_service('timeline.IService', object())
+
+    async def stop(self, ctx):
+        pass
+
+
+def test_framework_timeline():
+    name = 'tests_timeline_bundle'
+    module = types.ModuleType(name)
+    setattr(module, ACTIVATOR, Activator())
+    sys.modules[name] = module
+    timeline = Timeline()
+    loop = asyncio.new_event_loop()
+    try:
+        framework = create_framework([name], {}, timeline)
+        loop.run_until_complete(framework.start())
+        loop.run_until_complete(framework.stop())
+    finally:
+        loop.close()
+        del sys.modules[name]
+
+    events = {(event.category, event.name): event
+              for event in timeline.events()}
+    assert set(events) == {
+        ('install', name), ('import', name), ('service', 'register'),
+        ('start', name), ('framework', 'start'), ('stop', name),
+        ('framework', 'stop')}
+    bundle = events['start', name].track
+    assert bundle != 0
+    assert events['install', name].track == bundle
+    assert events['import', name].track == bundle
+    register = events['service', 'register']
+    assert register.args == {'classes': ('timeline.IService', )}
+    assert register.track == framework.bundles[0].id
@@ -0,0 +1,117 @@
+import pytest
+
+from atto.cdi import ServiceEvent, ServiceFactory
+from atto.cdi.bundle import BundleContext
+from atto.cdi.framework import Framework
+
+
+class IService:
+    pass
+
+
+class Listener:
+    def __init__(self):
+        self.events = []
+
+    def service_changed(self, event):
+        self.events.append((event.type, event.reference.get_property('name')))
+
+
+@pytest.fixture
+def context():
+    framework = Framework({})
+    return BundleContext(framework, framework)
+
+
+def test_events(context):
+    listener = Listener()
+    context.add_service_listener(listener, IService, '(group=db)')
+
+    registration = context.register_service(
+        IService, object(), {'name': 'psql', 'group': 'db'})
+    context.register_service(IService, object(), {'name': 'redis'})
+    context.register_service('Other', object(), {'group': 'db'})
+    registration.set_properties({'name': 'mysql', 'group': 'db'})
+    registration.set_properties({'name': 'mysql', 'group': 'cache'})
+    registration.unregister()
+
+    assert listener.events == [
+        (ServiceEvent.REGISTERED, 'psql'),
+        (ServiceEvent.MODIFIED, 'mysql'),
+        (ServiceEvent.MODIFIED_ENDMATCH, 'mysql'),
+    ]
+
+    assert context.remove_service_listener(listener)
+    context.register_service(IService, object(), {'group': 'db'})
+    assert len(listener.events) == 3
+
+
+def test_tracker(context):
+    first = context.register_service(IService, object(), {'name': 'first'})
+    tracker = context.track_services(IService, '(name=*)')
+    assert len(tracker) == 1
+    assert tracker.get_service_reference() == first.get_reference()
+
+    second = context.register_service(IService, object(), {
+        'name': 'second', 'service.ranking': 5})
+    context.register_service(IService, object())
+    assert tracker.get_service_reference() == second.get_reference()
+
+    first.set_properties({'name': 'first', 'service.ranking': 10})
+    assert tracker.get_service_references() == (
+        first.get_reference(), second.get_reference())
+
+    first.set_properties({})
+    assert tracker.get_service_references() == (second.get_reference(), )
+
+    second.unregister()
+    assert tracker.get_service_reference() is None
+    assert tracker.get_service() is None
+
+    tracker.close()
+    context.register_service(IService, object(), {'name': 'third'})
+    assert len(tracker) == 0
+
+
+def test_tracker_get_service(context):
+    service = object()
+    context.register_service(IService, service)
+    with context.track_services(IService) as tracker:
+        assert tracker.get_service() is service
+
+
+class CountingFactory(ServiceFactory):
+    def __init__(self):
+        self.got = 0
+        self.ungot = 0
+
+    def get_service(self, bundle, registration):
+        self.got += 1
+        return object()
+
+    def unget_service(self, bundle, registration, service):
+        self.ungot += 1
+
+
+def test_tracker_keeps_service(context):
+    factory = CountingFactory()
+    registration = context.register_service(IService, factory)
+    tracker = context.track_services(IService)
+    service = tracker.get_service()
+    assert tracker.get_service() is service
+    assert tracker.get_service(registration.get_reference()) is service
+    assert factory.got == 1
+
+    registration.unregister()
+    assert factory.ungot == 1
+    assert tracker.get_service() is None
+
+
+def test_tracker_close_releases_services(context):
+    factory = CountingFactory()
+    context.register_service(IService, factory, {'service.scope': 'prototype'})
+    tracker = context.track_services(IService)
+    service = tracker.get_service()
+    assert tracker.get_service() is service
+    tracker.close()
+    assert (factory.got, factory.ungot) == (1, 1)
@@ -1,11 +1,23 @@
+import asyncio
 import os
+import sys
 from unittest import mock
 
 import pytest
 
+from atto import settings as atto_settings
+from atto.cdi.framework import Framework
 from atto.conf import ModuleSettings, Settings
 
 
+def run(coro):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
 def test_empty():
     settings = Settings()
     with pytest.raises(AttributeError):
@@ -60,12 +72,23 @@ def test_extend_mistmatch_types():
         settings.extend(dict(FOO=1))
 
 
+def test_extend_float_with_int():
+    settings = Settings({'TIMEOUT': 5, 'DELAY': 0.5, 'FLAG': True})
+    settings.extend(dict(TIMEOUT=10.0, DELAY=1.0))
+    assert settings.TIMEOUT == 5
+    with pytest.raises(RuntimeError):
+        settings.extend(dict(FLAG=1.0))
+    with pytest.raises(RuntimeError):
+        Settings({'COUNT': 0.5}).extend(dict(COUNT=1))
+
+
 @mock.patch.dict(os.environ, {
     'BAR': 'env-bar',
     'INT': '123',
     'BYTE': 'env-byte',
     'BOOL_WORD': 'False',
     'BOOL_NUM': '0',
+    'FLOAT': '0.5',
 })
 def test_extend_with_envs():
     settings = Settings()
@@ -75,12 +98,14 @@ def test_extend_with_envs():
         'BYTE': b'byte',
         'BOOL_WORD': True,
         'BOOL_NUM': True,
+        'FLOAT': 1.0,
     })
     assert settings.BAR == 'env-bar'
     assert settings.INT == 123
     assert settings.BYTE == b'env-byte'
     assert not settings.BOOL_WORD
     assert not settings.BOOL_NUM
+    assert settings.FLOAT == 0.5
 
 
 @mock.patch.dict(os.environ, {'TEST_SETINGS': 'tests.conf.settings'})
@@ -88,3 +113,51 @@ def test_module_init():
     settings = ModuleSettings('TEST_SETINGS')
     assert settings.FOO == 'module foo'
     assert 'bar' not in settings
+
+
+def test_boot_cache_setting(tmp_path, monkeypatch):
+    monkeypatch.syspath_prepend(str(tmp_path))
+    tmp_path.joinpath('settings_bundle.py').write_text('')
+    path = str(tmp_path / 'boot.json')
+    settings = Settings({'BOOT_CACHE': path})
+    settings.extend(atto_settings)
+    assert settings.BOOT_CACHE == path
+    framework = Framework(settings)
+    framework.install_bundle('settings_bundle')
+    run(framework.start())
+    monkeypatch.delitem(sys.modules, 'settings_bundle')
+    assert os.path.isfile(path)
+
+    settings = Settings()
+    settings.extend(atto_settings)
+    assert not settings.BOOT_CACHE
+
+
+def test_bundle_manifest_setting(tmp_path, monkeypatch):
+    monkeypatch.syspath_prepend(str(tmp_path))
+    package = tmp_path / 'settings_package'
+    package.mkdir()
+    package.joinpath('__init__.py').write_text('')
+    path = str(tmp_path / 'manifest.json')
+    settings = Settings({'BUNDLE_MANIFEST': path})
+    settings.extend(atto_settings)
+    assert Framework(settings).install_package(str(package)) == []
+    assert os.path.isfile(path)
+
+    settings = Settings()
+    settings.extend(atto_settings)
+    assert Framework(settings).install_package(str(package)) == []
+
+
+def test_executor_workers_setting():
+    settings = Settings({'ACTIVATOR_EXECUTOR_WORKERS': 4})
+    settings.extend(atto_settings)
+    assert settings.ACTIVATOR_EXECUTOR_WORKERS == 4
+
+
+def test_stop_timeout_settings():
+    settings = Settings({'BUNDLE_STOP_TIMEOUT': 0.5,
+                         'FRAMEWORK_STOP_TIMEOUT': 5})
+    settings.extend(atto_settings)
+    assert settings.BUNDLE_STOP_TIMEOUT == 0.5
+    assert settings.FRAMEWORK_STOP_TIMEOUT == 5
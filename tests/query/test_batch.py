@@ -0,0 +1,38 @@
+import pytest
+
+from atto.query import create_query, filter_indices, match_many
+
+ROWS = [
+    {'name': 'redis', 'group': 'cache', 'rank': '1'},
+    {'name': 'psql', 'group': 'db', 'rank': '5'},
+    {'name': 'mysql', 'group': 'db'},
+    {'name': ['memcache', 'redis'], 'group': 'cache', 'rank': '3'},
+    {},
+]
+
+
+@pytest.mark.parametrize('filter', [
+    None,
+    '(name=redis)',
+    '(|(name=redis)(name=psql))',
+    '(&(group=db)(rank=*))',
+    '(!(group=cache))',
+    '(name=*sql)',
+    '(name~=cache)',
+    '(&(rank=*)(rank>=3))',
+    '(&(rank=*)(rank<=3))',
+    '(|(&(group=db)(!(rank=*)))(name=redis))',
+    {'group': 'cache'},
+])
+def test_same_as_match(filter):
+    query = create_query(filter)
+    expected = [bool(query.match(row)) for row in ROWS]
+    assert match_many(filter, ROWS) == expected
+    assert query.match_many(iter(ROWS)) == expected
+    assert filter_indices(filter, ROWS) == [
+        index for index, matched in enumerate(expected) if matched]
+
+
+def test_empty():
+    assert match_many('(name=redis)', []) == []
+    assert filter_indices('(name=redis)', []) == []
@@ -0,0 +1,51 @@
+import pytest
+
+from atto.query import create_query, query_cache
+from atto.query.cache import QueryCache
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    query_cache.clear()
+    yield
+    query_cache.clear()
+
+
+def test_shared_dict_query():
+    first = create_query({'name': 'redis', 'group': ['a', 'b']})
+    second = create_query({'group': ('a', 'b'), 'name': 'redis'})
+    assert first is second
+    info = query_cache.info()
+    assert info.hits == 1
+    assert info.misses == 1
+
+
+def test_immutable():
+    query = create_query({'name': 'redis', 'group': 'cache'})
+    with pytest.raises(AttributeError):
+        query.value = []
+    with pytest.raises(AttributeError):
+        query.value.append(None)
+    with pytest.raises(AttributeError):
+        query.value[0].name = 'foo'
+
+
+def test_unhashable_not_cached():
+    query = {'name': {'foo': 'bar'}}
+    assert create_query(query) is not create_query(query)
+    assert query_cache.info().currsize == 0
+
+
+def test_eviction():
+    cache = QueryCache(maxsize=2)
+    for key in 'abcb':
+        cache.get(key, object)
+    cache.get('c', object)
+    info = cache.info()
+    assert info.evictions == 1
+    assert info.hits == 2
+    assert info.misses == 3
+    assert info.currsize == 2
+
+    cache.clear()
+    assert cache.info() == (0, 0, 0, 2, 0)
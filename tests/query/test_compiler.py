@@ -0,0 +1,47 @@
+import pytest
+
+from atto.query import compile_query, nodes
+
+
+def node(cls, *children, **kwargs):
+    item = cls(**kwargs)
+    item.value.extend(children)
+    return item
+
+
+def test_all():
+    matcher = compile_query(None)
+    assert matcher({})
+    assert matcher({'foo': 'bar'})
+
+
+def test_dict():
+    matcher = compile_query({'name': 'redis', 'group': 'cache'})
+    assert matcher({'name': 'redis', 'group': 'cache'})
+    assert matcher({'name': ['psql', 'redis'], 'group': 'cache'})
+    assert not matcher({'name': 'redis'})
+    assert not matcher({'name': 'psql', 'group': 'cache'})
+
+
+@pytest.mark.parametrize('query', [
+    nodes.EqNode('redis', 'name'),
+    nodes.PresentNode('*', 'name'),
+    nodes.ApproxNode('edi', 'name'),
+    nodes.LteNode(10, 'ranking'),
+    nodes.GteNode(1, 'ranking'),
+    node(nodes.AndNode, nodes.EqNode('redis', 'name'),
+         nodes.GteNode(1, 'ranking')),
+    node(nodes.OrNode, nodes.EqNode('psql', 'name'),
+         nodes.EqNode('redis', 'name')),
+    node(nodes.NotNode, nodes.EqNode('psql', 'name')),
+    nodes.AllNode(),
+    nodes.NoneNode(),
+])
+@pytest.mark.parametrize('params', [
+    {},
+    {'name': 'redis', 'ranking': 5},
+    {'name': ['psql', 'mysql'], 'ranking': 0},
+    {'name': 'mysql', 'ranking': 20},
+])
+def test_same_as_tree(query, params):
+    assert bool(compile_query(query)(params)) == bool(query.match(params))
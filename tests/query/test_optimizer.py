@@ -0,0 +1,103 @@
+import pytest
+
+from atto.query import compile_query, create_query, match_many, nodes
+from atto.query.optimizer import optimize
+from atto.query.parser import _parse_query
+
+
+def test_flatten():
+    query = create_query('(&(a=1)(&(b=2)(&(c=3))))')
+    assert type(query) is nodes.AndNode
+    assert [item.name for item in query.value] == ['a', 'b', 'c']
+
+
+def test_deduplicate():
+    query = create_query('(&(a=1)(b=2)(a=1))')
+    assert len(query.value) == 2
+
+    query = create_query('(|(a=1)(a=1))')
+    assert type(query) is nodes.EqNode
+
+
+@pytest.mark.parametrize('filter,node_class', [
+    ('(&(a=1)(*))', nodes.EqNode),
+    ('(&(*)(*))', nodes.AllNode),
+    ('(|(a=1)(*))', nodes.AllNode),
+    ('(!(*))', nodes.NoneNode),
+    ('(!(!(*)))', nodes.AllNode),
+    ('(&(a=1)(!(*)))', nodes.NoneNode),
+    ('(!(!(a=1)))', nodes.EqNode),
+    ('(&)', nodes.AllNode),
+    ('(|)', nodes.NoneNode),
+])
+def test_fold(filter, node_class):
+    assert type(create_query(filter)) is node_class
+
+
+def test_order_by_cost():
+    query = create_query('(&(name=re*is)(rank>=1)(group=db)(label))')
+    assert [type(item) for item in query.value] == [
+        nodes.PresentNode, nodes.EqNode, nodes.GteNode, nodes.SubstringNode]
+
+
+def test_merge_eq():
+    query = create_query('(|(name=redis)(group=db)(name=psql)(name=mysql))')
+    assert type(query) is nodes.OrNode
+    merged, eq = query.value
+    assert type(merged) is nodes.InNode
+    assert merged.value == {'redis', 'psql', 'mysql'}
+    assert type(eq) is nodes.EqNode
+
+
+def test_merge_eq_dict():
+    query = create_query({'name': ['redis', 'psql']})
+    assert type(query) is nodes.InNode
+    assert query.match({'name': 'psql'})
+    assert query.match({'name': ['mysql', 'redis']})
+    assert not query.match({'name': 'mysql'})
+    assert not query.match({'name': {}})
+
+
+@pytest.mark.parametrize('value, matched', [
+    (['psql', {}], True),
+    ([{}, []], False),
+    ([['redis'], 'redis'], True),
+    ({}, False),
+])
+def test_merged_eq_unhashable(value, matched):
+    filter = '(|(name=redis)(name=psql))'
+    params = {'name': value}
+    query = create_query(filter)
+    assert type(query) is nodes.InNode
+    assert bool(_parse_query(filter).match(params)) is matched
+    assert query.match(params) is matched
+    assert compile_query(filter)(params) is matched
+    assert match_many(filter, [params]) == [matched]
+
+
+@pytest.mark.parametrize('filter', [
+    '(&(a=1)(&(b=2)(|(a=1)(a=2)(c=*))))',
+    '(|(a=1)(!(b=2))(a=2)(&(c=3)(c=3)))',
+    '(!(|(a=1)(a=3)(b=*)))',
+    '(|(a=1*)(b<=2)(c>=3)(b=2))',
+])
+@pytest.mark.parametrize('params', [
+    {},
+    {'a': '1'},
+    {'a': '2', 'b': '2'},
+    {'a': ['3', '4'], 'c': '3'},
+    {'b': '1', 'c': '0'},
+])
+def test_same_result(filter, params):
+    query = _parse_query(filter)
+    assert bool(optimize(query).match(params)) == bool(query.match(params))
+
+
+@pytest.mark.parametrize('value', [1, None, ['redis', 2], [3]])
+def test_approx_not_string(value):
+    filter = '(|(name~=dis)(rank<=2))'
+    params = {'name': value}
+    matched = value == ['redis', 2]
+    assert create_query(filter).match(params) is matched
+    assert compile_query(filter)(params) is matched
+    assert match_many(filter, [params]) == [matched]
@@ -0,0 +1,126 @@
+import pytest
+
+from atto.query import create_query, nodes, query_cache
+from atto.query.errors import QueryError
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    query_cache.clear()
+
+
+def test_simple():
+    query = create_query('(name=redis)')
+    assert isinstance(query, nodes.EqNode)
+    assert query.name == 'name'
+    assert query.value == 'redis'
+
+
+@pytest.mark.parametrize('filter,node_class', [
+    ('(*)', nodes.AllNode),
+    ('(name)', nodes.PresentNode),
+    ('(name=*)', nodes.PresentNode),
+    ('(name~=red)', nodes.ApproxNode),
+    ('(rank<=1)', nodes.LteNode),
+    ('(rank>=1)', nodes.GteNode),
+    ('(name=re*is)', nodes.SubstringNode),
+    ('name=redis', nodes.EqNode),
+    ('(&(a=1)(b=2))', nodes.AndNode),
+    ('(|(a=1)(b=2))', nodes.OrNode),
+    ('(!(a=1))', nodes.NotNode),
+])
+def test_node_types(filter, node_class):
+    assert type(create_query(filter)) is node_class
+
+
+def test_nested():
+    query = create_query(' ( & (name=redis) (| (a=1) (!(b=2)) ) ) ')
+    assert query.match({'name': 'redis', 'a': '1'})
+    assert query.match({'name': 'redis', 'b': '3'})
+    assert not query.match({'name': 'redis', 'b': '2'})
+    assert not query.match({'name': 'psql', 'a': '1'})
+
+
+def test_escapes():
+    query = create_query(r'(name=a\2a\28b\29\5c\c5\82)')
+    assert query.value == 'a*(b)\\ł'
+
+    query = create_query(r'(name=\2a*)')
+    assert query.match({'name': '*foo'})
+    assert not query.match({'name': 'foo'})
+
+
+def test_substring():
+    query = create_query('(name=re*d.*s)')
+    assert query.match({'name': 'RedD.is'})
+    assert query.match({'name': ['psql', 'red.is']})
+    assert not query.match({'name': 'redis'})
+
+
+@pytest.mark.parametrize('filter,position', [
+    ('', 0),
+    ('(a=1', 0),
+    ('(&(a=1)', 0),
+    ('(a=1))', 5),
+    ('(a=1)x', 5),
+    ('(=1)', 1),
+    ('(a<1)', 2),
+    ('(a=(1)', 3),
+    ('(!)', 0),
+    ('(!(a=1)(b=1))', 0),
+    ('(a=1\\', 4),
+    ('(a=\\c5)', 3),
+])
+def test_errors(filter, position):
+    with pytest.raises(QueryError) as info:
+        create_query(filter)
+    assert info.value.position == position
+
+
+def test_error_is_type_error():
+    with pytest.raises(TypeError):
+        create_query('(a=1')
+
+
+class CountedStr(str):
+    # counts characters read by parser
+    reads = 0
+
+    def __getitem__(self, index):
+        CountedStr.reads += 1
+        return str.__getitem__(self, index)
+
+
+def test_linear_time():
+    def parse_steps(size):
+        filter = CountedStr('(|{})'.format(
+            ''.join('(name=service{})'.format(i) for i in range(size))))
+        CountedStr.reads = 0
+        query = create_query(filter)
+        assert len(query.value) == size
+        return CountedStr.reads / len(filter)
+
+    assert parse_steps(20000) <= parse_steps(200) * 1.1
+
+
+@pytest.mark.parametrize('operator', ['&', '|'])
+def test_deep_same_nesting(operator):
+    depth = 5000
+    filter = '({}'.format(operator) * depth + '(a=1)(b=2)' + ')' * depth
+    query = create_query(filter)
+    assert type(query) is _LOGIC_CLASSES[operator]
+    assert {item.name for item in query.value} == {'a', 'b'}
+
+
+def test_deep_mixed_nesting():
+    filter = '(&(|' * 25 + '(a=1)' + '))' * 25
+    assert create_query(filter).match({'a': '1'})
+    filter = '(&(|' * 1000 + '(a=1)' + '))' * 1000
+    with pytest.raises(QueryError) as info:
+        create_query(filter)
+    assert 'nested' in str(info.value)
+    with pytest.raises(QueryError):
+        create_query('(!' * 1000 + '(a=1)' + ')' * 1000)
+
+
+_LOGIC_CLASSES = {'&': nodes.AndNode, '|': nodes.OrNode}
@@ -0,0 +1,72 @@
+import copy
+
+import pytest
+
+from atto.query import compile_query, match_many
+from atto.query.errors import QueryError
+from atto.query.schema import Schema, schema_key
+
+SCHEMA = {'rank': int, 'enabled': bool}
+
+
+def test_coerce_literal():
+    matcher = compile_query('(&(rank>=10)(rank<=20))', SCHEMA)
+    assert matcher({'rank': 10})
+    assert matcher({'rank': 15})
+    assert matcher({'rank': '20'})
+    assert not matcher({'rank': 9})
+    assert not matcher({'rank': 100})
+    assert not matcher({'rank': 'high'})
+
+
+def test_eq():
+    matcher = compile_query('(|(rank=1)(rank=2)(enabled=true))', SCHEMA)
+    assert matcher({'rank': 1})
+    assert matcher({'rank': [5, 2]})
+    assert matcher({'enabled': True})
+    assert not matcher({'enabled': False, 'rank': 3})
+
+
+def test_without_schema():
+    matcher = compile_query('(rank>=10)')
+    assert not matcher({'rank': 100})
+    assert matcher({'rank': '9'})
+
+
+def test_invalid_literal():
+    with pytest.raises(QueryError) as info:
+        compile_query('(rank>=ten)', SCHEMA)
+    assert 'rank' in str(info.value)
+
+
+def test_batch():
+    rows = [{'rank': 1}, {'rank': '5'}, {'rank': 10}, {}]
+    assert match_many('(rank>=5)', rows, SCHEMA) == [
+        False, True, True, False]
+
+
+def test_schema_key():
+    schema = Schema(SCHEMA)
+    assert schema_key(schema) is schema.key
+    assert schema.key == schema_key(dict(SCHEMA))
+    assert schema_key(Schema()) is None
+    assert compile_query('(rank>=10)', schema) is \
+        compile_query('(rank>=10)', SCHEMA)
+
+
+@pytest.mark.parametrize('change', [
+    lambda schema: schema.__setitem__('rank', str),
+    lambda schema: schema.__delitem__('rank'),
+    lambda schema: schema.update(rank=str),
+    lambda schema: schema.setdefault('other', int),
+    lambda schema: schema.pop('rank'),
+    lambda schema: schema.popitem(),
+    lambda schema: schema.clear(),
+])
+def test_schema_readonly(change):
+    schema = Schema(SCHEMA)
+    with pytest.raises(TypeError):
+        change(schema)
+    assert schema == SCHEMA
+    assert schema.key == schema_key(dict(SCHEMA))
+    assert copy.copy(schema) == schema
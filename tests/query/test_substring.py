@@ -0,0 +1,41 @@
+import re
+
+import pytest
+
+from atto.query import create_query, nodes
+from atto.query.substring import SubstringPattern
+
+
+@pytest.mark.parametrize('pattern', [
+    'foo*', '*foo', '*foo*', 'f*o', 'f*o*o', '*f*o*', 'fo*oo*', '*', '**',
+    'a*b*c*d', '*.*', 'ab*ba', 'foo*bar*', '*a*b*c*', 'a*a*a', 'ab*b*ba',
+])
+@pytest.mark.parametrize('value', [
+    '', 'foo', 'FOO', 'xfoox', 'fo', 'foxo', 'f.o', 'fooo', 'abcd', 'axbxcxd',
+    'aba', 'abba', 'ab.ba', 'dcba', 'foobar', 'FOOxBARx', 'xfooxbar', 'aaa',
+    'aa', 'abbba', 'abcabc',
+])
+def test_same_as_regex(pattern, value):
+    pattern = SubstringPattern(pattern.split('*'))
+    assert bool(pattern.match(value)) == bool(pattern.regex.match(value))
+
+
+def test_not_string():
+    pattern = SubstringPattern(['foo', ''])
+    assert not pattern.match(1)
+    assert not pattern.match(None)
+
+
+def test_node():
+    query = create_query('(name=Re*IS)')
+    assert type(query) is nodes.SubstringNode
+    assert query.value == SubstringPattern(['re', 'is'])
+    assert query.match({'name': 'redis'})
+    assert query.match({'name': ['psql', 'RE-IS']})
+    assert not query.match({'name': 'psql'})
+
+
+def test_regex_value():
+    query = nodes.SubstringNode(re.compile('^re.*s$'), 'name')
+    assert query.match({'name': 'redis'})
+    assert not query.match({'name': 'psql'})